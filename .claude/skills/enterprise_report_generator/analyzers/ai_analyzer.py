@@ -63,7 +63,12 @@ class AIAnalyzer:
     将收集的原始数据通过 Gemini API 分析，生成结构化的三层报告
     """
 
-    def __init__(self):
+    def __init__(self, use_cache: bool = True):
+        """
+        Args:
+            use_cache: 是否缓存 Gemini 生成响应
+        """
+        self.use_cache = use_cache
         self.errors: list[str] = []
 
     async def analyze(self, collected_data: CollectedData) -> EnterpriseReport:
@@ -136,7 +141,7 @@ class AIAnalyzer:
                 website_content=website_content,
             )
 
-            async with GeminiClient() as client:
+            async with GeminiClient(use_cache=self.use_cache) as client:
                 ai_result, error = await client.generate_json(
                     prompt=prompt,
                     system_instruction=BASIC_INFO_SYSTEM,
@@ -180,7 +185,7 @@ class AIAnalyzer:
             sales_intel_raw=sales_intel_raw.model_dump(),
         )
 
-        async with GeminiClient() as client:
+        async with GeminiClient(use_cache=self.use_cache) as client:
             ai_result, error = await client.generate_json(
                 prompt=prompt,
                 system_instruction=SALES_APPROACH_SYSTEM,
@@ -224,7 +229,7 @@ class AIAnalyzer:
             if social_section:
                 prompt += "\n\n" + social_section
 
-        async with GeminiClient() as client:
+        async with GeminiClient(use_cache=self.use_cache) as client:
             ai_result, error = await client.generate_json(
                 prompt=prompt,
                 system_instruction=SIGNALS_SYSTEM,
@@ -721,17 +726,21 @@ class AIAnalyzer:
 # 便捷函数
 # ============================================================
 
-async def analyze_collected_data(collected_data: CollectedData) -> EnterpriseReport:
+async def analyze_collected_data(
+    collected_data: CollectedData,
+    use_cache: bool = True,
+) -> EnterpriseReport:
     """
     分析收集数据的便捷函数
 
     Args:
         collected_data: 收集的数据
+        use_cache: 是否缓存 Gemini 生成响应
 
     Returns:
         EnterpriseReport
     """
-    analyzer = AIAnalyzer()
+    analyzer = AIAnalyzer(use_cache=use_cache)
     return await analyzer.analyze(collected_data)
 
 
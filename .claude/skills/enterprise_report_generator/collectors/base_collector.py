@@ -84,7 +84,7 @@ class BaseCollector(ABC, Generic[T]):
             # 写入缓存
             if self.use_cache and self.cache and not self.errors:
                 serialized = self._serialize(result)
-                self.cache.set(self.cache_category, cache_key, serialized)
+                await self.cache.aset(self.cache_category, cache_key, serialized)
 
         except Exception as e:
             logger.error(f"[{self.name}] 收集失败: {e}")
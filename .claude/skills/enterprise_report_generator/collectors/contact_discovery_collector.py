@@ -183,7 +183,7 @@ class ContactDiscoveryCollector(BaseCollector[ContactDiscoveryRaw]):
             f'"{company_name}" 代表取締役 OR CEO OR 社長',
         ]
 
-        async with SerperClient() as serper:
+        async with SerperClient(use_cache=self.use_cache) as serper:
             for query in queries:
                 try:
                     resp = await serper.search(query, num_results=5)
@@ -215,7 +215,7 @@ class ContactDiscoveryCollector(BaseCollector[ContactDiscoveryRaw]):
         raw_results = []
 
         try:
-            async with SerperClient() as serper:
+            async with SerperClient(use_cache=self.use_cache) as serper:
                 resp = await serper.search(
                     f'"{company_name}" site:wantedly.com',
                     num_results=5,
@@ -249,7 +249,7 @@ class ContactDiscoveryCollector(BaseCollector[ContactDiscoveryRaw]):
         raw_results = []
 
         try:
-            async with SerperClient() as serper:
+            async with SerperClient(use_cache=self.use_cache) as serper:
                 resp = await serper.search(
                     f'"{company_name}" site:prtimes.jp 問い合わせ先',
                     num_results=5,
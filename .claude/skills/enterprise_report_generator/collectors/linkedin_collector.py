@@ -122,7 +122,7 @@ class LinkedInCollector(BaseCollector):
 
             # 缓存结果
             if self.cache:
-                self.cache.set(self.cache_category, cache_key, self._serialize_linkedin_data(result))
+                await self.cache.aset(self.cache_category, cache_key, self._serialize_linkedin_data(result))
 
             return result
 
@@ -149,7 +149,7 @@ class LinkedInCollector(BaseCollector):
         # 通过搜索引擎查找
         from ..utils.serper_client import SerperClient
 
-        async with SerperClient(self.config.serper) as serper:
+        async with SerperClient(self.config.serper, use_cache=self.use_cache) as serper:
             search_query = f"{seed.company_name} LinkedIn company"
             results = await serper.search(search_query, num_results=5)
 
@@ -252,7 +252,7 @@ class LinkedInCollector(BaseCollector):
         try:
             from ..utils.gemini_client import GeminiClient
 
-            async with GeminiClient(self.config.gemini) as gemini:
+            async with GeminiClient(self.config.gemini, use_cache=self.use_cache) as gemini:
                 result = await gemini.generate_json(prompt)
 
                 if not result or "key_persons" not in result:
@@ -187,7 +187,7 @@ class SalesIntelCollector(BaseCollector[SalesIntelRaw]):
             (f"site:linkedin.com {company_name}", "linkedin"),
         ]
 
-        async with SerperClient() as client:
+        async with SerperClient(use_cache=self.use_cache) as client:
             for query, result_type in queries:
                 try:
                     response = await client.search(query, num_results=10)
@@ -295,7 +295,7 @@ class SignalCollector(BaseCollector[SignalsRaw]):
 
         query = f"{company_name} ニュース OR プレスリリース {last_year} OR {current_year}"
 
-        async with SerperClient() as client:
+        async with SerperClient(use_cache=self.use_cache) as client:
             # 使用新闻搜索
             response = await client.search_news(query, num_results=15)
 
@@ -332,7 +332,7 @@ class SignalCollector(BaseCollector[SignalsRaw]):
 
         all_results = []
 
-        async with SerperClient() as client:
+        async with SerperClient(use_cache=self.use_cache) as client:
             for query in queries:
                 response = await client.search(query, num_results=5)
 
@@ -373,7 +373,7 @@ class SignalCollector(BaseCollector[SignalsRaw]):
 
         all_results = []
 
-        async with SerperClient() as client:
+        async with SerperClient(use_cache=self.use_cache) as client:
             for query in queries:
                 response = await client.search(query, num_results=5)
 
@@ -408,7 +408,7 @@ class SignalCollector(BaseCollector[SignalsRaw]):
         """
         query = f"site:prtimes.jp {company_name}"
 
-        async with SerperClient() as client:
+        async with SerperClient(use_cache=self.use_cache) as client:
             response = await client.search(query, num_results=10)
 
             if response.error:
@@ -141,7 +141,7 @@ class SocialMediaCollector(BaseCollector):
 
         platform_urls = {}
 
-        async with SerperClient(self.config.serper) as serper:
+        async with SerperClient(self.config.serper, use_cache=self.use_cache) as serper:
             # 并行搜索各平台
             search_tasks = {}
             for platform in self.enabled_platforms:
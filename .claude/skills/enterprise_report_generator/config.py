@@ -21,6 +21,8 @@ class SerperConfig:
     base_url: str = "https://google.serper.dev"
     timeout: int = 30
     max_retries: int = 3
+    # HTTP 传输后端: "httpx" (默认) | "aiohttp" (高并发 batch_search，需安装 aiohttp)
+    transport: str = field(default_factory=lambda: os.getenv("SERPER_TRANSPORT", "httpx"))
 
 
 @dataclass
@@ -30,6 +32,7 @@ class GBizInfoConfig:
     base_url: str = "https://info.gbiz.go.jp/hojin/v1"
     timeout: int = 30
     max_retries: int = 3
+    max_concurrency: int = 20  # get_many 的最大并发数
 
 
 @dataclass
@@ -63,6 +66,10 @@ class BrightDataConfig:
     # LinkedIn 配置
     max_employees_per_request: int = 50
     max_key_persons: int = 10
+    # 合并并发的 search_people 为一次 trigger: 仅当数据集记录回传 input 字段时有效，默认关闭
+    merge_people_searches: bool = field(
+        default_factory=lambda: os.getenv("BRIGHT_DATA_MERGE_SEARCHES", "") == "1"
+    )
     # 社交媒体配置
     enable_social_media: bool = True
     max_posts_per_platform: int = 5
@@ -112,6 +119,12 @@ class CacheConfig:
     ai_analysis_ttl: int = 7 * 24 * 60 * 60       # 7天
     linkedin_ttl: int = 7 * 24 * 60 * 60          # 7天 (LinkedIn 数据)
 
+    # API 响应缓存 TTL (秒)
+    gemini_response_ttl: int = 60 * 60            # 1小时
+    serper_search_ttl: int = 24 * 60 * 60         # 24小时
+    serper_news_ttl: int = 15 * 60                # 15分钟
+    response_stale_ttl: int = 7 * 24 * 60 * 60    # 过期后保留 7 天，上游失败时兜底返回
+
 
 @dataclass
 class Config:
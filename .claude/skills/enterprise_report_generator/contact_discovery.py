@@ -21,6 +21,9 @@ from .config import get_config
 from .models import SeedData
 from .collectors.contact_discovery_collector import ContactDiscoveryCollector
 from .collectors.contact_models import ContactDiscoveryRaw
+from .utils.cache import get_cache
+from .utils.gemini_client import aclose_module_client as aclose_gemini_client
+from .utils.serper_client import aclose_module_client as aclose_serper_client
 
 logging.basicConfig(
     level=logging.INFO,
@@ -141,6 +144,9 @@ def main():
             max_linkedin_lookups=args.max_linkedin,
         )
         result = await collector.run(seed)
+        await get_cache().aclose()
+        await aclose_gemini_client()
+        await aclose_serper_client()
 
         # 导出
         filepath = export_contacts_md(result, seed, config.output_dir)
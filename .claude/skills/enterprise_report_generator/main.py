@@ -28,6 +28,10 @@ from .collectors import (
 from .analyzers import AIAnalyzer
 from .validators.quality_checker import QualityChecker, QualityCheckResult
 from .exporters import DataExporter
+from .utils.cache import get_cache
+from .utils.gbizinfo_client import aclose_module_client as aclose_gbizinfo_client
+from .utils.gemini_client import aclose_module_client as aclose_gemini_client
+from .utils.serper_client import aclose_module_client as aclose_serper_client
 
 # 配置日志
 logging.basicConfig(
@@ -85,10 +89,12 @@ class ReportGenerator:
         # Step 1: 并行收集数据
         logger.info("Step 1: 收集数据...")
         collected_data = await self._collect_data(seed)
+        if self.use_cache:
+            await get_cache().flush()
 
         # Step 2: AI 分析
         logger.info("Step 2: AI 分析...")
-        analyzer = AIAnalyzer()
+        analyzer = AIAnalyzer(use_cache=self.use_cache)
         report = await analyzer.analyze(collected_data)
 
         # Step 3: 质量检查
@@ -103,6 +109,10 @@ class ReportGenerator:
             kb_path = exporter.export(collected_data, report)
             logger.info(f"报告已导出: {kb_path}")
 
+        # AI 分析阶段排队的 Gemini 缓存写入，在返回前落盘
+        if self.use_cache:
+            await get_cache().flush()
+
         # 完成
         duration = (datetime.now() - start_time).total_seconds()
         logger.info(f"=== 报告生成完成 ===")
@@ -291,6 +301,11 @@ def main():
             save_to_file=not args.no_save,
             enable_contacts=enable_contacts,
         )
+        await aclose_gbizinfo_client()
+        await aclose_gemini_client()
+        await aclose_serper_client()
+        # 停止缓存后台写入任务前先落盘（否则 asyncio.run 退出时会取消写入任务、丢掉未写的条目）
+        await get_cache().aclose()
 
         # 打印质量信息
         print(f"\n--- 质量检查 ---")
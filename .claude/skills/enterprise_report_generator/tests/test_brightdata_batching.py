@@ -0,0 +1,131 @@
+"""
+BrightDataClient search_people 合并测试
+
+用假的 _make_request 代替 Bright Data 接口，检查 trigger 次数与结果分发
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.config import BrightDataConfig, Config
+from enterprise_report_generator.utils.brightdata_client import BrightDataClient
+
+
+class FakeTransport:
+    """记录每次 trigger 的输入，并为每个输入返回一条员工记录"""
+
+    def __init__(self, echo_input: bool = True, error: Exception = None):
+        self.echo_input = echo_input
+        self.error = error
+        self.triggers: list[list[dict]] = []
+
+    async def __call__(self, dataset_id, inputs, **kwargs):
+        self.triggers.append(list(inputs))
+        await asyncio.sleep(0)
+        if self.error is not None:
+            raise self.error
+        records = []
+        for item in inputs:
+            record = {"name": f"person of {item['keyword']}", "title": "CEO"}
+            if self.echo_input:
+                record["input"] = dict(item)
+            records.append(record)
+        return records
+
+
+def make_client(transport: FakeTransport, merge: bool) -> BrightDataClient:
+    config = Config(brightdata=BrightDataConfig(api_key="test", merge_people_searches=merge))
+    client = BrightDataClient(config)
+    client._make_request = transport
+    return client
+
+
+async def search_all(client, companies):
+    return await asyncio.gather(*(client.search_people(name) for name in companies))
+
+
+def names(results):
+    return [[e.name for e in employees] for employees in results]
+
+
+def test_merging_is_off_by_default():
+    transport = FakeTransport()
+    client = make_client(transport, merge=False)
+
+    results = asyncio.run(search_all(client, ["A", "B", "C"]))
+
+    assert names(results) == [["person of A"], ["person of B"], ["person of C"]]
+    assert [len(inputs) for inputs in transport.triggers] == [1, 1, 1]
+
+
+def test_concurrent_searches_merge_into_one_trigger():
+    transport = FakeTransport()
+    client = make_client(transport, merge=True)
+
+    results = asyncio.run(search_all(client, ["A", "B", "A", "C"]))
+
+    assert names(results) == [["person of A"], ["person of B"], ["person of A"], ["person of C"]]
+    # 相同 (keyword, limit) 只发送一次
+    assert len(transport.triggers) == 1
+    assert [item["keyword"] for item in transport.triggers[0]] == ["A", "B", "C"]
+
+
+def test_max_batch_flushes_immediately():
+    transport = FakeTransport()
+    client = make_client(transport, merge=True)
+    client.SEARCH_MAX_BATCH = 2
+
+    results = asyncio.run(search_all(client, ["A", "B", "C", "D"]))
+
+    assert names(results) == [["person of A"], ["person of B"], ["person of C"], ["person of D"]]
+    assert [len(inputs) for inputs in transport.triggers] == [2, 2]
+
+
+def test_missing_echo_falls_back_and_disables_merging():
+    transport = FakeTransport(echo_input=False)
+    client = make_client(transport, merge=True)
+
+    async def run():
+        first = await search_all(client, ["A", "B"])
+        second = await search_all(client, ["C", "D"])
+        return first, second
+
+    first, second = asyncio.run(run())
+
+    assert names(first) == [["person of A"], ["person of B"]]
+    assert names(second) == [["person of C"], ["person of D"]]
+    # 合并 1 次 + 逐个 2 次；之后不再合并
+    assert [len(inputs) for inputs in transport.triggers] == [2, 1, 1, 1, 1]
+    assert client._merge_searches is False
+
+
+def test_trigger_error_reaches_every_caller():
+    transport = FakeTransport(error=RuntimeError("boom"))
+    client = make_client(transport, merge=True)
+
+    async def run():
+        return await asyncio.gather(
+            *(client.search_people(name) for name in ["A", "B"]), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert len(transport.triggers) == 1
+    assert client._search_buf == []
+
+
+def test_flush_task_reference_is_released():
+    transport = FakeTransport()
+    client = make_client(transport, merge=True)
+
+    asyncio.run(search_all(client, ["A", "B"]))
+
+    assert client._search_flush_tasks == set()
+    assert client._search_flush_handle is None
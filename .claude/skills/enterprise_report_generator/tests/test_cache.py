@@ -0,0 +1,235 @@
+"""
+FileCache 测试
+
+覆盖异步写入队列跨事件循环的落盘行为，以及 single_flight / cached_response / @cached
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.config import CacheConfig
+from enterprise_report_generator.utils import cache as cache_module
+from enterprise_report_generator.utils.cache import (
+    FileCache,
+    cached,
+    cached_response,
+    single_flight,
+)
+
+
+@pytest.fixture
+def file_cache(tmp_path):
+    return FileCache(CacheConfig(cache_dir=tmp_path))
+
+
+@pytest.fixture
+def global_cache(file_cache, monkeypatch):
+    """让 get_cache() 返回临时目录下的缓存"""
+    monkeypatch.setattr(cache_module, "_cache", file_cache)
+    return file_cache
+
+
+def read_back(tmp_path, category, identifier):
+    """用新的实例从磁盘读取，确认条目确实已落盘"""
+    return FileCache(CacheConfig(cache_dir=tmp_path)).get(category, identifier)
+
+
+def test_aset_then_flush_same_loop(file_cache, tmp_path):
+    async def run():
+        await file_cache.aset("test", "key", {"v": 1})
+        assert file_cache.get("test", "key") == {"v": 1}
+        await file_cache.flush()
+
+    asyncio.run(run())
+    assert file_cache._pending == {}
+    assert read_back(tmp_path, "test", "key") == {"v": 1}
+
+
+def test_flush_in_second_loop_does_not_hang(file_cache, tmp_path):
+    # 第一个循环结束时后台写入任务被取消，条目只在 _pending 中
+    asyncio.run(file_cache.aset("test", "key", {"v": 1}))
+    assert read_back(tmp_path, "test", "key") is None
+
+    asyncio.run(asyncio.wait_for(file_cache.flush(), timeout=1))
+
+    assert file_cache._pending == {}
+    assert read_back(tmp_path, "test", "key") == {"v": 1}
+
+
+def test_aset_in_second_loop_writes_both(file_cache, tmp_path):
+    asyncio.run(file_cache.aset("test", "first", 1))
+
+    async def second():
+        await file_cache.aset("test", "second", 2)
+        await file_cache.aclose()
+
+    asyncio.run(second())
+
+    assert read_back(tmp_path, "test", "first") == 1
+    assert read_back(tmp_path, "test", "second") == 2
+
+
+def test_atexit_hook_drains_pending(file_cache, tmp_path):
+    asyncio.run(file_cache.aset("test", "key", "value"))
+
+    cache_module._drain_live_caches()
+
+    assert file_cache._pending == {}
+    assert read_back(tmp_path, "test", "key") == "value"
+
+
+# ============================================================
+# single_flight
+# ============================================================
+
+def test_single_flight_coalesces_concurrent_calls():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"n": calls}
+
+    async def run():
+        return await asyncio.gather(*(single_flight("k", fetch) for _ in range(5)))
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(r is results[0] for r in results)
+    assert not cache_module._inflight
+
+
+def test_single_flight_waiters_get_leader_error():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream down")
+
+    async def run():
+        return await asyncio.gather(
+            *(single_flight("k", fetch) for _ in range(3)), return_exceptions=True
+        )
+
+    results = asyncio.run(run())
+
+    assert calls == 1
+    assert all(isinstance(r, ValueError) for r in results)
+    assert not cache_module._inflight
+
+
+def test_single_flight_waiter_retries_when_leader_cancelled():
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return calls
+
+    async def run():
+        leader = asyncio.create_task(single_flight("k", fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(single_flight("k", fetch))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await waiter
+
+    assert asyncio.run(run()) == 2
+    assert calls == 2
+    assert not cache_module._inflight
+
+
+# ============================================================
+# cached_response
+# ============================================================
+
+def test_cached_response_fresh_hit_skips_fetch(global_cache):
+    calls = 0
+
+    async def fetch():
+        nonlocal calls
+        calls += 1
+        return {"answer": 42}
+
+    async def run():
+        first = await cached_response("test", "req", fetch, ttl_seconds=60)
+        second = await cached_response("test", "req", fetch, ttl_seconds=60)
+        return first, second
+
+    assert asyncio.run(run()) == (({"answer": 42}, False), ({"answer": 42}, False))
+    assert calls == 1
+
+
+def test_cached_response_serves_stale_on_failure(global_cache):
+    async def ok():
+        return {"answer": 42}
+
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    async def run():
+        # ttl=0: 写入后立即过期，只能作为兜底副本
+        await cached_response("test", "req", ok, ttl_seconds=0, stale_ttl_seconds=60)
+        return await cached_response("test", "req", fail, ttl_seconds=0, stale_ttl_seconds=60)
+
+    assert asyncio.run(run()) == ({"answer": 42}, True)
+
+
+def test_cached_response_raises_without_stale_copy(global_cache):
+    async def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cached_response("test", "req", fail, ttl_seconds=60))
+
+
+# ============================================================
+# @cached
+# ============================================================
+
+def test_cached_async_coalesces_misses(global_cache):
+    calls = 0
+
+    @cached("test")
+    async def lookup(name):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return name.upper()
+
+    async def run():
+        results = await asyncio.gather(*(lookup("abc") for _ in range(4)))
+        return results, await lookup("abc")
+
+    results, again = asyncio.run(run())
+
+    assert results == ["ABC"] * 4
+    assert again == "ABC"
+    assert calls == 1
+
+
+def test_cached_sync_function(global_cache):
+    calls = 0
+
+    @cached("test", key_func=lambda x: str(x))
+    def square(x):
+        nonlocal calls
+        calls += 1
+        return x * x
+
+    assert square(3) == 9
+    assert square(3) == 9
+    assert calls == 1
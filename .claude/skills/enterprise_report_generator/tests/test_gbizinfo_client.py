@@ -0,0 +1,60 @@
+"""
+GBizInfoClient 测试
+
+共享客户端不固定 API Token：不同配置的请求各自带上自己的 Token
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.config import GBizInfoConfig
+from enterprise_report_generator.utils import gbizinfo_client
+from enterprise_report_generator.utils.gbizinfo_client import GBizInfoClient
+
+
+def test_shared_client_sends_each_configs_token(monkeypatch):
+    seen_tokens = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_tokens.append(request.headers.get("X-hojinInfo-api-token"))
+        return httpx.Response(200, json={"hojin-infos": [{"name": "テスト株式会社"}]})
+
+    async def run():
+        # 预置模块级共享客户端，用 MockTransport 代替网络
+        shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(gbizinfo_client, "_module_client", shared)
+        monkeypatch.setattr(gbizinfo_client, "_module_client_loop", asyncio.get_running_loop())
+
+        async with GBizInfoClient(GBizInfoConfig(api_token="token-a")) as first:
+            a = await first.get_by_corporate_number("4120001222866")
+        async with GBizInfoClient(GBizInfoConfig(api_token="token-b")) as second:
+            b = await second.search_by_name("テスト")
+        await shared.aclose()
+        return a, b
+
+    a, b = asyncio.run(run())
+
+    assert a.name == "テスト株式会社"
+    assert b[0].name == "テスト株式会社"
+    assert seen_tokens == ["token-a", "token-b"]
+
+
+def test_module_client_has_no_token(monkeypatch):
+    monkeypatch.setattr(gbizinfo_client, "_module_client", None)
+
+    async def run():
+        client = gbizinfo_client._get_module_client(GBizInfoConfig(api_token="token-a"))
+        try:
+            return dict(client.headers)
+        finally:
+            await gbizinfo_client.aclose_module_client()
+
+    headers = asyncio.run(run())
+
+    assert "x-hojininfo-api-token" not in headers
@@ -0,0 +1,61 @@
+"""
+GeminiClient 测试
+
+generate_json 的 markdown 代码块与尾逗号容错
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.config import GeminiConfig
+from enterprise_report_generator.utils.gemini_client import GeminiClient, GeminiResponse
+
+
+def generate_json_from(text):
+    """让 generate() 直接返回 text，调用 generate_json"""
+    client = GeminiClient(GeminiConfig(api_key="test"), use_cache=False)
+
+    async def fake_generate(**kwargs):
+        return GeminiResponse(text=text, model="test")
+
+    client.generate = fake_generate
+    return asyncio.run(client.generate_json("prompt"))
+
+
+@pytest.mark.parametrize("text, expected", [
+    ('{"a": 1}', {"a": 1}),
+    ('```json\n{"a": 1}\n```', {"a": 1}),
+    ('```\n[1, 2]\n```', [1, 2]),
+    ('```json\n{"a": 1}', {"a": 1}),
+    ('{"a": [1, 2,], "b": {"c": 3,},}', {"a": [1, 2], "b": {"c": 3}}),
+])
+def test_generate_json_parses(text, expected):
+    assert generate_json_from(text) == (expected, None)
+
+
+def test_trailing_comma_fix_leaves_string_values_alone():
+    text = '{"hint": "列挙: A, B, }", "list": ["x, ]", "y\\", ]",], "n": 1,}'
+
+    parsed, error = generate_json_from(text)
+
+    assert error is None
+    assert parsed == {"hint": "列挙: A, B, }", "list": ["x, ]", 'y", ]'], "n": 1}
+
+
+def test_valid_json_is_not_rewritten():
+    parsed, error = generate_json_from('{"hint": "a, }", "more": "b ,]"}')
+
+    assert (parsed, error) == ({"hint": "a, }", "more": "b ,]"}, None)
+
+
+def test_invalid_json_reports_error():
+    parsed, error = generate_json_from('{"a": ')
+
+    assert parsed is None
+    assert error.startswith("JSON parse error")
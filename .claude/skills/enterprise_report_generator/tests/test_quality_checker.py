@@ -0,0 +1,43 @@
+"""
+QualityChecker 测试
+
+URL 格式校验
+"""
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.validators.quality_checker import QualityChecker
+
+
+@pytest.mark.parametrize("url", [
+    "https://www.sparticle.com/ja",
+    "http://example.co.jp",
+    "https://localhost:8080/path",
+    "http://192.168.0.1/",
+    "https://[::1]/",
+])
+def test_valid_urls(url):
+    assert QualityChecker._is_valid_url(url)
+
+
+@pytest.mark.parametrize("url", [
+    "https://example .com",
+    "https://example.com/a b",
+    "https://exa\tmple.com",
+    "https://example.com/\n",
+    "https://example.com\r\n/path",
+    "https://example.com/　",
+    "\thttps://example.com",
+    "ftp://example.com",
+    "https://example",
+    "https://example.com:99999",
+    "example.com",
+])
+def test_invalid_urls(url):
+    assert not QualityChecker._is_valid_url(url)
@@ -0,0 +1,60 @@
+"""
+SerperClient 测试
+
+共享客户端不固定 API Key：不同配置的请求各自带上自己的 Key
+"""
+import asyncio
+import sys
+from pathlib import Path
+
+import httpx
+import orjson
+
+# 确保可以导入项目模块
+project_root = Path(__file__).parent.parent.parent
+sys.path.insert(0, str(project_root))
+
+from enterprise_report_generator.config import SerperConfig
+from enterprise_report_generator.utils import serper_client
+from enterprise_report_generator.utils.serper_client import SerperClient
+
+
+def test_shared_client_sends_each_configs_api_key(monkeypatch):
+    seen_keys = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen_keys.append(request.headers.get("X-API-KEY"))
+        return httpx.Response(200, content=orjson.dumps({"organic": []}))
+
+    async def run():
+        # 预置模块级共享客户端，用 MockTransport 代替网络
+        shared = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        monkeypatch.setattr(serper_client, "_module_client", shared)
+        monkeypatch.setattr(serper_client, "_module_client_loop", asyncio.get_running_loop())
+
+        first = SerperClient(SerperConfig(api_key="key-a"), use_cache=False)
+        second = SerperClient(SerperConfig(api_key="key-b"), use_cache=False)
+        assert first.client is second.client is shared
+
+        await first.search("q1")
+        await second.search("q2")
+        await shared.aclose()
+
+    asyncio.run(run())
+
+    assert seen_keys == ["key-a", "key-b"]
+
+
+def test_module_client_has_no_api_key(monkeypatch):
+    monkeypatch.setattr(serper_client, "_module_client", None)
+
+    async def run():
+        client = serper_client._get_module_client(SerperConfig(api_key="key-a"))
+        try:
+            return dict(client.headers)
+        finally:
+            await serper_client.aclose_module_client()
+
+    headers = asyncio.run(run())
+
+    assert "x-api-key" not in headers
@@ -6,6 +6,7 @@ from .serper_client import (
     SerperResponse,
     SearchResult,
     search_company_info,
+    search_company_info_all,
     batch_search,
 )
 from .gbizinfo_client import (
@@ -25,6 +26,7 @@ from .cache import (
     get_cache,
     cache_get,
     cache_set,
+    cache_aset,
     cache_delete,
     cached,
 )
@@ -47,6 +49,7 @@ __all__ = [
     "SerperResponse",
     "SearchResult",
     "search_company_info",
+    "search_company_info_all",
     "batch_search",
     # gBizINFO
     "GBizInfoClient",
@@ -63,6 +66,7 @@ __all__ = [
     "get_cache",
     "cache_get",
     "cache_set",
+    "cache_aset",
     "cache_delete",
     "cached",
     # Bright Data (LinkedIn)
@@ -10,17 +10,20 @@ Bright Data API 客户端 (LinkedIn + 社交媒体数据采集)
 - YouTube: Profiles / Videos / Comments
 - Reddit: Posts / Comments
 """
+import asyncio
 import httpx
 import logging
 from typing import Optional, Any
 from dataclasses import dataclass, field
 
+import orjson
+
 from ..config import get_config
 
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(slots=True)
 class LinkedInEmployee:
     """LinkedIn 员工概览数据"""
     name: str
@@ -29,7 +32,7 @@ class LinkedInEmployee:
     profile_image: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class LinkedInCompanyProfile:
     """LinkedIn 公司资料"""
     name: str
@@ -40,14 +43,10 @@ class LinkedInCompanyProfile:
     headquarters: Optional[str] = None
     founded: Optional[str] = None
     website: Optional[str] = None
-    employees: list[LinkedInEmployee] = None
+    employees: list[LinkedInEmployee] = field(default_factory=list)
 
-    def __post_init__(self):
-        if self.employees is None:
-            self.employees = []
 
-
-@dataclass
+@dataclass(slots=True)
 class LinkedInPersonProfile:
     """LinkedIn 个人详细资料"""
     name: str
@@ -56,20 +55,12 @@ class LinkedInPersonProfile:
     company: Optional[str] = None
     location: Optional[str] = None
     summary: Optional[str] = None
-    experience: list[dict] = None
-    education: list[dict] = None
-    skills: list[str] = None
+    experience: list[dict] = field(default_factory=list)
+    education: list[dict] = field(default_factory=list)
+    skills: list[str] = field(default_factory=list)
     email: Optional[str] = None
     phone: Optional[str] = None
 
-    def __post_init__(self):
-        if self.experience is None:
-            self.experience = []
-        if self.education is None:
-            self.education = []
-        if self.skills is None:
-            self.skills = []
-
 
 @dataclass
 class SocialProfile:
@@ -163,6 +154,13 @@ class BrightDataClient:
         "reddit": DATASET_REDDIT_POSTS,
     }
 
+    # 快照下载分块大小 (字节)
+    DOWNLOAD_CHUNK_SIZE = 65536
+
+    # search_people 合并窗口: 窗口内的并发搜索合并为一次 trigger (需开启 merge_people_searches)
+    SEARCH_BATCH_WINDOW = 0.02  # 秒
+    SEARCH_MAX_BATCH = 20
+
     def __init__(self, config=None):
         self.config = config or get_config()
         self.api_key = self.config.brightdata.api_key
@@ -170,13 +168,20 @@ class BrightDataClient:
         self.timeout = self.config.brightdata.timeout
         self.max_retries = self.config.brightdata.max_retries
 
-    def _get_headers(self) -> dict:
-        """获取请求头"""
-        return {
+        # 请求头只构建一次，挂在 AsyncClient 上供所有请求复用
+        self._headers = {
             "Authorization": f"Bearer {self.api_key}",
             "Content-Type": "application/json",
         }
 
+        # 是否合并并发的 search_people (发现记录不回传 input 后自动关闭)
+        self._merge_searches = self.config.brightdata.merge_people_searches
+        # 等待合并的 search_people 请求: (input, future)
+        self._search_buf: list[tuple[dict, asyncio.Future]] = []
+        self._search_flush_handle: Optional[asyncio.TimerHandle] = None
+        # 进行中的刷新任务 (持有引用，防止任务在执行中被 GC 回收)
+        self._search_flush_tasks: set[asyncio.Task] = set()
+
     async def _make_request(
         self,
         dataset_id: str,
@@ -200,8 +205,6 @@ class BrightDataClient:
         Returns:
             API 响应数据
         """
-        import asyncio
-
         if not self.api_key:
             logger.error("Bright Data API key not configured")
             return None
@@ -210,11 +213,10 @@ class BrightDataClient:
         trigger_url = f"{self.BASE_URL}?dataset_id={dataset_id}&format={format}"
 
         try:
-            async with httpx.AsyncClient(timeout=self.timeout) as client:
+            async with httpx.AsyncClient(timeout=self.timeout, headers=self._headers) as client:
                 response = await client.post(
                     trigger_url,
-                    headers=self._get_headers(),
-                    json=inputs
+                    content=orjson.dumps(inputs)
                 )
 
                 if response.status_code == 401:
@@ -224,7 +226,7 @@ class BrightDataClient:
                     logger.error(f"Bright Data trigger error: {response.status_code} - {response.text}")
                     return None
 
-                trigger_result = response.json()
+                trigger_result = orjson.loads(response.content)
                 snapshot_id = trigger_result.get("snapshot_id")
 
                 if not snapshot_id:
@@ -242,32 +244,20 @@ class BrightDataClient:
                     await asyncio.sleep(poll_interval)
                     waited += poll_interval
 
-                    status_response = await client.get(
-                        progress_url,
-                        headers=self._get_headers()
-                    )
+                    status_response = await client.get(progress_url)
 
                     if status_response.status_code != 200:
                         logger.warning(f"Progress check failed: {status_response.status_code}")
                         continue
 
-                    status_data = status_response.json()
+                    status_data = orjson.loads(status_response.content)
                     status = status_data.get("status")
                     logger.debug(f"Snapshot {snapshot_id} status: {status}")
 
                     if status == "ready":
                         # Step 3: 下载结果
                         download_url = f"https://api.brightdata.com/datasets/v3/snapshot/{snapshot_id}?format={format}"
-                        download_response = await client.get(
-                            download_url,
-                            headers=self._get_headers()
-                        )
-
-                        if download_response.status_code == 200:
-                            return download_response.json()
-                        else:
-                            logger.error(f"Download failed: {download_response.status_code} - {download_response.text}")
-                            return None
+                        return await self._download_snapshot(client, download_url)
 
                     elif status == "failed":
                         logger.error(f"Snapshot collection failed: {status_data}")
@@ -283,6 +273,24 @@ class BrightDataClient:
             logger.error(f"Request error: {e}")
             return None
 
+    async def _download_snapshot(self, client: httpx.AsyncClient, download_url: str) -> Optional[Any]:
+        """流式下载快照结果
+
+        按块读入同一个 bytearray 后直接用 orjson 解析字节，
+        不经过 response.text 的 str 解码，降低大快照的峰值内存。
+        """
+        async with client.stream("GET", download_url) as response:
+            if response.status_code != 200:
+                await response.aread()
+                logger.error(f"Download failed: {response.status_code} - {response.text}")
+                return None
+
+            buf = bytearray()
+            async for chunk in response.aiter_bytes(self.DOWNLOAD_CHUNK_SIZE):
+                buf.extend(chunk)
+
+        return orjson.loads(buf)
+
     async def get_company_profile(self, linkedin_url: str) -> Optional[LinkedInCompanyProfile]:
         """获取公司资料及员工概览
 
@@ -352,9 +360,9 @@ class BrightDataClient:
             company=data.get("company") or data.get("current_company"),
             location=data.get("location"),
             summary=data.get("summary") or data.get("about"),
-            experience=data.get("experience", []),
-            education=data.get("education", []),
-            skills=data.get("skills", []),
+            experience=data.get("experience") or [],
+            education=data.get("education") or [],
+            skills=data.get("skills") or [],
             email=data.get("email"),
             phone=data.get("phone")
         )
@@ -527,19 +535,17 @@ class BrightDataClient:
         if title_filter:
             query_parts.append(f"title:{title_filter}")
 
-        inputs = [{
+        search_input = {
             "keyword": " ".join(query_parts),
             "limit": limit
-        }]
-
-        result = await self._make_request(self.DATASET_PEOPLE_SEARCH, inputs)
+        }
 
-        if not result:
-            return []
+        if self._merge_searches:
+            results = await self._enqueue_search(search_input)
+        else:
+            results = self._as_records(await self._make_request(self.DATASET_PEOPLE_SEARCH, [search_input]))
 
         employees = []
-        results = result if isinstance(result, list) else [result]
-
         for data in results[:limit]:
             if isinstance(data, dict):
                 employees.append(LinkedInEmployee(
@@ -551,6 +557,104 @@ class BrightDataClient:
 
         return employees
 
+    async def _enqueue_search(self, search_input: dict) -> list[dict]:
+        """把搜索请求放入合并缓冲区，等待批量 trigger 的结果"""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._search_buf.append((search_input, fut))
+
+        if len(self._search_buf) >= self.SEARCH_MAX_BATCH:
+            # 满批立即取走，之后到达的请求进入新的一批
+            self._start_search_flush(loop)
+        elif self._search_flush_handle is None:
+            self._search_flush_handle = loop.call_later(
+                self.SEARCH_BATCH_WINDOW, self._start_search_flush, loop
+            )
+
+        return await fut
+
+    def _start_search_flush(self, loop: asyncio.AbstractEventLoop):
+        """取走缓冲区，创建刷新任务并保存引用，完成后移除"""
+        if self._search_flush_handle is not None:
+            self._search_flush_handle.cancel()
+            self._search_flush_handle = None
+        batch, self._search_buf = self._search_buf, []
+        if not batch:
+            return
+
+        task = loop.create_task(self._flush_search_batch(batch))
+        self._search_flush_tasks.add(task)
+        task.add_done_callback(self._search_flush_tasks.discard)
+
+    @staticmethod
+    def _search_key(search_input: dict) -> tuple[str, str]:
+        """合并/分发用的键: (keyword, limit)；limit 转成字符串，兼容回传时类型变化"""
+        return search_input.get("keyword"), str(search_input.get("limit"))
+
+    async def _flush_search_batch(self, batch: list[tuple[dict, asyncio.Future]]):
+        """
+        合并一批搜索为一次 trigger，并按输入分发结果
+
+        分发依赖 Bright Data 在每条记录的 input 字段回传触发时的输入 (keyword / limit)。
+        若有记录缺少或对不上该字段，无法确定归属，则退回为每个输入单独 trigger，
+        并关闭本客户端后续的合并。
+        """
+        # 相同 (keyword, limit) 的请求只发送一次，结果共享
+        inputs: dict[tuple[str, str], dict] = {}
+        for item, _ in batch:
+            inputs.setdefault(self._search_key(item), item)
+
+        try:
+            if len(inputs) == 1:
+                (key, item), = inputs.items()
+                buckets = {key: self._as_records(await self._make_request(self.DATASET_PEOPLE_SEARCH, [item]))}
+            else:
+                logger.info(f"Merged {len(batch)} LinkedIn people searches into one trigger")
+                buckets = await self._merged_search(inputs)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for item, fut in batch:
+            if not fut.done():
+                fut.set_result(list(buckets[self._search_key(item)]))
+
+    async def _merged_search(self, inputs: dict[tuple[str, str], dict]) -> dict[tuple[str, str], list[dict]]:
+        """多个输入合并为一次 trigger，按记录的 input 字段分回；无法归属时逐个 trigger"""
+        records = self._as_records(
+            await self._make_request(self.DATASET_PEOPLE_SEARCH, list(inputs.values()))
+        )
+
+        buckets: dict[tuple[str, str], list[dict]] = {key: [] for key in inputs}
+        for record in records:
+            record_input = record.get("input")
+            key = self._search_key(record_input) if isinstance(record_input, dict) else None
+            if key not in buckets:
+                break
+            buckets[key].append(record)
+        else:
+            return buckets
+
+        # 合并的快照已白等一轮，之后不再合并
+        self._merge_searches = False
+        logger.warning(
+            "LinkedIn people search records do not echo their input; "
+            f"falling back to {len(inputs)} separate triggers and disabling merged searches "
+            "(unset BRIGHT_DATA_MERGE_SEARCHES)"
+        )
+        results = await asyncio.gather(*(
+            self._make_request(self.DATASET_PEOPLE_SEARCH, [item]) for item in inputs.values()
+        ))
+        return {key: self._as_records(result) for key, result in zip(inputs, results)}
+
+    @staticmethod
+    def _as_records(result: Any) -> list[dict]:
+        """_make_request 的结果 → 记录列表 (只保留 dict)"""
+        records = result if isinstance(result, list) else ([result] if result else [])
+        return [record for record in records if isinstance(record, dict)]
+
 
 # 便捷函数
 async def get_company_linkedin_data(linkedin_url: str) -> Optional[LinkedInCompanyProfile]:
@@ -3,28 +3,45 @@
 
 轻量级文件缓存，支持 TTL
 """
-import json
+import asyncio
+import atexit
+import functools
 import hashlib
 import logging
-from datetime import datetime, timedelta
+import os
+import time
+import weakref
+from contextlib import suppress
 from pathlib import Path
-from typing import Optional, Any, TypeVar, Generic
+from typing import Optional, Any, Awaitable, Callable, Hashable, TypeVar, Generic, Iterator
 from dataclasses import dataclass
 
+import orjson
+import xxhash
+
 from ..config import get_config, CacheConfig
 
 logger = logging.getLogger(__name__)
 
 T = TypeVar("T")
 
+# 后台写入每批最多合并的条目数
+WRITE_BATCH_SIZE = 64
+# 凑批等待时间 (秒)
+WRITE_BATCH_WAIT = 0.01
+# 分片子目录名 (hash 前 2 位 → 256 个子目录)
+SHARD_NAMES = [f"{i:02x}" for i in range(256)]
+# 所有存活的 FileCache，解释器退出时写出各自未落盘的条目
+_live_caches: "weakref.WeakSet[FileCache]" = weakref.WeakSet()
+
 
-@dataclass
+@dataclass(slots=True)
 class CacheEntry(Generic[T]):
     """缓存条目"""
     key: str
     value: T
-    created_at: datetime
-    expires_at: datetime
+    created_at: float  # Unix 时间戳
+    expires_at: float  # Unix 时间戳
     hit: bool = False
 
 
@@ -35,16 +52,38 @@ class FileCache:
         self.config = config or get_config().cache
         self._ensure_cache_dir()
 
+        # 异步写入队列 (aset 使用)，由后台任务批量落盘
+        self._write_q: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        # 尚未落盘的条目 (path → 队列条目)，保证 aset 之后立即 get 也能命中
+        self._pending: dict[Path, tuple[Path, bytes, float]] = {}
+        _live_caches.add(self)
+
     def _ensure_cache_dir(self):
-        """确保缓存目录存在"""
+        """确保缓存目录及分片子目录存在"""
         if self.config.enabled:
             self.config.cache_dir.mkdir(parents=True, exist_ok=True)
+            for shard in SHARD_NAMES:
+                (self.config.cache_dir / shard).mkdir(exist_ok=True)
 
     def _get_cache_path(self, key: str) -> Path:
         """获取缓存文件路径"""
-        # 使用 hash 避免文件名过长或包含非法字符
-        key_hash = hashlib.md5(key.encode()).hexdigest()
-        return self.config.cache_dir / f"{key_hash}.json"
+        # 使用 hash 避免文件名过长或包含非法字符 (xxh3 比 md5 快一个数量级)
+        key_hash = xxhash.xxh3_128_hexdigest(key.encode())
+        # 按 hash 前 2 位分片，避免单目录文件过多
+        return self.config.cache_dir / key_hash[:2] / f"{key_hash}.json"
+
+    def _iter_cache_files(self) -> Iterator[os.DirEntry]:
+        """遍历所有缓存文件 (分片子目录 + 旧版平铺文件)"""
+        with os.scandir(self.config.cache_dir) as root:
+            for entry in root:
+                if entry.is_dir():
+                    with os.scandir(entry.path) as shard:
+                        for sub in shard:
+                            if sub.name.endswith(".json") and sub.is_file():
+                                yield sub
+                elif entry.name.endswith(".json") and entry.is_file():
+                    yield entry
 
     def _make_key(self, category: str, identifier: str) -> str:
         """生成缓存键"""
@@ -67,25 +106,23 @@ class FileCache:
         key = self._make_key(category, identifier)
         cache_path = self._get_cache_path(key)
 
-        if not cache_path.exists():
+        pending = self._pending.get(cache_path)
+        if pending is None and not cache_path.exists():
             logger.debug(f"Cache miss: {key}")
             return None
 
         try:
-            with open(cache_path, "r", encoding="utf-8") as f:
-                data = json.load(f)
+            data = orjson.loads(pending[1] if pending is not None else cache_path.read_bytes())
 
-            expires_at = datetime.fromisoformat(data["expires_at"])
-
-            if datetime.now() > expires_at:
+            if time.time() > data["expires_at"]:
                 logger.debug(f"Cache expired: {key}")
-                cache_path.unlink()  # 删除过期缓存
+                cache_path.unlink(missing_ok=True)  # 删除过期缓存
                 return None
 
             logger.debug(f"Cache hit: {key}")
             return data["value"]
 
-        except (json.JSONDecodeError, KeyError, ValueError) as e:
+        except (orjson.JSONDecodeError, KeyError, ValueError, TypeError) as e:
             logger.warning(f"Cache read error for {key}: {e}")
             return None
 
@@ -111,33 +148,160 @@ class FileCache:
         if not self.config.enabled:
             return False
 
-        # 确定 TTL
-        if ttl_seconds is None:
-            ttl_seconds = self._get_default_ttl(category)
+        key = self._make_key(category, identifier)
+        cache_path = self._get_cache_path(key)
+
+        try:
+            payload, expires_at = self._build_payload(category, key, value, ttl_seconds)
+            self._write_file(cache_path, payload, expires_at)
+            self._pending.pop(cache_path, None)
+
+            logger.debug(f"Cache set: {key}")
+            return True
+
+        except Exception as e:
+            logger.error(f"Cache write error for {key}: {e}")
+            return False
+
+    async def aset(
+        self,
+        category: str,
+        identifier: str,
+        value: Any,
+        ttl_seconds: Optional[int] = None
+    ) -> bool:
+        """
+        异步设置缓存
+
+        只做序列化并放入写入队列，由后台任务批量写盘，不阻塞事件循环。
+        进程退出前应 await flush() 或 aclose()；未落盘的条目会在下次换事件循环
+        或解释器退出 (atexit) 时同步写盘。
+
+        Args:
+            category: 缓存类别
+            identifier: 标识符
+            value: 要缓存的值
+            ttl_seconds: TTL 秒数，默认使用配置
+
+        Returns:
+            是否成功入队
+        """
+        if not self.config.enabled:
+            return False
 
         key = self._make_key(category, identifier)
         cache_path = self._get_cache_path(key)
 
-        now = datetime.now()
-        expires_at = now + timedelta(seconds=ttl_seconds)
+        try:
+            payload, expires_at = self._build_payload(category, key, value, ttl_seconds)
+        except Exception as e:
+            logger.error(f"Cache write error for {key}: {e}")
+            return False
+
+        item = (cache_path, payload, expires_at)
+        self._ensure_writer()
+        self._pending[cache_path] = item
+        self._write_q.put_nowait(item)
+        logger.debug(f"Cache queued: {key}")
+        return True
+
+    async def flush(self):
+        """等待写入队列中的条目全部落盘"""
+        if self._write_q is None:
+            return
+        if self._writer_is_stale(asyncio.get_running_loop()):
+            # 写入任务属于已结束的事件循环，队列不会再被消费，不能 join()
+            self._drain_pending()
+            return
+        await self._write_q.join()
+
+    async def aclose(self):
+        """落盘所有待写条目并停止后台写入任务"""
+        await self.flush()
+        if self._writer_task is not None and not self._writer_task.done():
+            self._writer_task.cancel()
+            with suppress(asyncio.CancelledError):
+                await self._writer_task
+        self._writer_task = None
+        self._write_q = None
+
+    def _build_payload(
+        self,
+        category: str,
+        key: str,
+        value: Any,
+        ttl_seconds: Optional[int]
+    ) -> tuple[bytes, float]:
+        """序列化缓存条目，返回 (JSON 字节串, 过期时间戳)"""
+        # 确定 TTL
+        if ttl_seconds is None:
+            ttl_seconds = self._get_default_ttl(category)
+
+        # 过期时间存为 Unix 时间戳，读取时只需一次浮点比较
+        now = time.time()
 
         data = {
             "key": key,
             "value": value,
-            "created_at": now.isoformat(),
-            "expires_at": expires_at.isoformat(),
+            "created_at": now,
+            "expires_at": now + ttl_seconds,
         }
+        payload = orjson.dumps(data, default=str, option=orjson.OPT_NON_STR_KEYS)
+        return payload, data["expires_at"]
+
+    def _writer_is_stale(self, loop: asyncio.AbstractEventLoop) -> bool:
+        """后台写入任务已结束或属于其他事件循环"""
+        return self._writer_task.done() or self._writer_task.get_loop() is not loop
+
+    def _ensure_writer(self):
+        """启动后台写入任务 (绑定到当前事件循环)"""
+        loop = asyncio.get_running_loop()
+        if self._writer_task is None or self._writer_is_stale(loop):
+            # 旧循环队列里的条目已无人消费，先同步写盘
+            self._drain_pending()
+            self._write_q = asyncio.Queue()
+            self._writer_task = loop.create_task(self._writer_loop(self._write_q))
+
+    def _drain_pending(self):
+        """同步写出所有未落盘条目，并丢弃旧的写入队列 (换事件循环 / 解释器退出时使用)"""
+        batch = list(self._pending.values())
+        self._pending.clear()
+        self._write_q = None
+        self._writer_task = None
+        if batch:
+            self._write_batch(batch)
+
+    async def _writer_loop(self, queue: asyncio.Queue):
+        """后台写入循环：凑批后在线程池中一次性写盘"""
+        while True:
+            item = await queue.get()
+            batch = [item]
+            with suppress(asyncio.TimeoutError):
+                while len(batch) < WRITE_BATCH_SIZE:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout=WRITE_BATCH_WAIT))
 
-        try:
-            with open(cache_path, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False, indent=2, default=str)
-
-            logger.debug(f"Cache set: {key} (TTL: {ttl_seconds}s)")
-            return True
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            finally:
+                for item in batch:
+                    if self._pending.get(item[0]) is item:
+                        del self._pending[item[0]]
+                    queue.task_done()
+
+    @classmethod
+    def _write_batch(cls, batch: list[tuple[Path, bytes, float]]):
+        """批量写入缓存文件 (在工作线程中执行)"""
+        for cache_path, payload, expires_at in batch:
+            try:
+                cls._write_file(cache_path, payload, expires_at)
+            except Exception as e:
+                logger.error(f"Cache write error for {cache_path.name}: {e}")
 
-        except Exception as e:
-            logger.error(f"Cache write error for {key}: {e}")
-            return False
+    @staticmethod
+    def _write_file(cache_path: Path, payload: bytes, expires_at: float):
+        """写入缓存文件，并把 mtime 设为过期时间，清理时只需 stat 无需解析"""
+        cache_path.write_bytes(payload)
+        os.utime(cache_path, (expires_at, expires_at))
 
     def delete(self, category: str, identifier: str) -> bool:
         """
@@ -153,6 +317,7 @@ class FileCache:
         key = self._make_key(category, identifier)
         cache_path = self._get_cache_path(key)
 
+        self._pending.pop(cache_path, None)
         if cache_path.exists():
             cache_path.unlink()
             logger.debug(f"Cache deleted: {key}")
@@ -174,15 +339,15 @@ class FileCache:
             return 0
 
         count = 0
-        for cache_file in self.config.cache_dir.glob("*.json"):
+        for cache_file in self._iter_cache_files():
             try:
                 if category:
-                    with open(cache_file, "r", encoding="utf-8") as f:
-                        data = json.load(f)
+                    with open(cache_file.path, "rb") as f:
+                        data = orjson.loads(f.read())
                     if not data.get("key", "").startswith(f"{category}:"):
                         continue
 
-                cache_file.unlink()
+                os.unlink(cache_file.path)
                 count += 1
             except Exception:
                 pass
@@ -194,6 +359,9 @@ class FileCache:
         """
         清理过期缓存
 
+        文件 mtime 即过期时间 (见 _write_file)，只需 stat 不读文件内容。
+        旧版文件的 mtime 是写入时间，会被视为过期一并清理。
+
         Returns:
             清理的缓存数量
         """
@@ -201,25 +369,29 @@ class FileCache:
             return 0
 
         count = 0
-        now = datetime.now()
+        now = time.time()
 
-        for cache_file in self.config.cache_dir.glob("*.json"):
+        for cache_file in self._iter_cache_files():
             try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                expires_at = datetime.fromisoformat(data["expires_at"])
-                if now > expires_at:
-                    cache_file.unlink()
+                if cache_file.stat().st_mtime <= now:
+                    os.unlink(cache_file.path)
                     count += 1
-            except Exception:
-                # 无法读取的文件也删除
-                cache_file.unlink()
-                count += 1
+            except OSError:
+                pass
 
         logger.info(f"Expired cache cleaned: {count} entries")
         return count
 
+    async def acleanup_expired(self) -> int:
+        """
+        异步清理过期缓存 (先落盘待写条目，再在线程池中清理，不阻塞事件循环)
+
+        Returns:
+            清理的缓存数量
+        """
+        await self.flush()
+        return await asyncio.to_thread(self.cleanup_expired)
+
     def _get_default_ttl(self, category: str) -> int:
         """获取默认 TTL"""
         ttl_map = {
@@ -244,23 +416,18 @@ class FileCache:
         expired = 0
         valid = 0
         size_bytes = 0
-        now = datetime.now()
+        now = time.time()
 
-        for cache_file in self.config.cache_dir.glob("*.json"):
+        for cache_file in self._iter_cache_files():
+            st = cache_file.stat()
             total += 1
-            size_bytes += cache_file.stat().st_size
+            size_bytes += st.st_size
 
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    data = json.load(f)
-
-                expires_at = datetime.fromisoformat(data["expires_at"])
-                if now > expires_at:
-                    expired += 1
-                else:
-                    valid += 1
-            except Exception:
+            # mtime 即过期时间
+            if st.st_mtime <= now:
                 expired += 1
+            else:
+                valid += 1
 
         return {
             "total": total,
@@ -275,6 +442,13 @@ class FileCache:
 # 全局缓存实例
 # ============================================================
 
+
+@atexit.register
+def _drain_live_caches():
+    """解释器退出时同步写出未 flush 的条目"""
+    for cache in list(_live_caches):
+        cache._drain_pending()
+
 _cache: Optional[FileCache] = None
 
 
@@ -305,22 +479,159 @@ def cache_set(
     return get_cache().set(category, identifier, value, ttl_seconds)
 
 
+async def cache_aset(
+    category: str,
+    identifier: str,
+    value: Any,
+    ttl_seconds: Optional[int] = None
+) -> bool:
+    """异步设置缓存 (后台批量写盘)"""
+    return await get_cache().aset(category, identifier, value, ttl_seconds)
+
+
 def cache_delete(category: str, identifier: str) -> bool:
     """删除缓存"""
     return get_cache().delete(category, identifier)
 
 
+# ============================================================
+# API 响应缓存
+# ============================================================
+
+def request_cache_key(namespace: str, body: Any) -> str:
+    """
+    生成请求级缓存键
+
+    Args:
+        namespace: 命名空间 (如模型名 / 路由名)
+        body: 请求体，按键排序后序列化
+
+    Returns:
+        32 位十六进制摘要
+    """
+    material = namespace.encode() + b"|" + orjson.dumps(
+        body, default=str, option=orjson.OPT_SORT_KEYS
+    )
+    return hashlib.blake2b(material, digest_size=16).hexdigest()
+
+
+async def cached_response(
+    category: str,
+    request_key: str,
+    fetch: Callable[[], Awaitable[Any]],
+    ttl_seconds: int,
+    stale_ttl_seconds: Optional[int] = None,
+) -> tuple[Any, bool]:
+    """
+    带过期兜底的响应缓存
+
+    新鲜期内直接返回缓存；过期或未命中时调用 fetch()。
+    fetch() 失败且存在过期副本时返回过期副本，而不是抛出异常。
+
+    Args:
+        category: 缓存类别
+        request_key: 请求缓存键 (见 request_cache_key)
+        fetch: 无参协程函数，返回可 JSON 序列化的响应数据
+        ttl_seconds: 新鲜期 (秒)
+        stale_ttl_seconds: 过期后继续保留用于兜底的时间 (秒)
+
+    Returns:
+        (响应数据, 是否为过期副本)
+    """
+    cache = get_cache()
+    entry = cache.get(category, request_key)
+    now = time.time()
+
+    if entry is not None and now < entry["fresh_until"]:
+        return entry["data"], False
+
+    try:
+        data = await fetch()
+    except Exception as e:
+        if entry is not None:
+            logger.warning(f"Upstream failed, serving stale {category} response: {e}")
+            return entry["data"], True
+        raise
+
+    await cache.aset(
+        category,
+        request_key,
+        {"data": data, "fresh_until": now + ttl_seconds},
+        ttl_seconds + (stale_ttl_seconds or 0),
+    )
+    return data, False
+
+
+# ============================================================
+# 并发请求合并
+# ============================================================
+
+# 进行中的请求 key -> Future，用于合并并发的相同调用
+_inflight: dict[Hashable, asyncio.Future] = {}
+
+
+class _LeaderCancelled(Exception):
+    """执行 fn() 的调用方被取消，等待方需重新发起"""
+
+
+async def single_flight(key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+    """
+    合并并发的相同调用 (single-flight)
+
+    同一 key 已有调用在进行中时，直接等待其结果，不再重复执行 fn()。
+    执行方被取消时，等待方不会跟着失败，而是由其中一个重新执行 fn()。
+
+    Args:
+        key: 调用标识 (如 (category, request_key))
+        fn: 无参协程函数
+
+    Returns:
+        fn() 的返回值 (并发调用方共享同一对象)
+    """
+    while (fut := _inflight.get(key)) is not None:
+        try:
+            return await asyncio.shield(fut)
+        except _LeaderCancelled:
+            continue
+
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await fn()
+        fut.set_result(result)
+        return result
+
+    except asyncio.CancelledError:
+        fut.set_exception(_LeaderCancelled())
+        fut.exception()
+        raise
+
+    except BaseException as e:
+        fut.set_exception(e)
+        fut.exception()  # 无等待者时避免 "exception was never retrieved"
+        raise
+
+    finally:
+        _inflight.pop(key, None)
+
+
 # ============================================================
 # 缓存装饰器
 # ============================================================
 
+
 def cached(category: str, key_func=None, ttl_seconds: Optional[int] = None):
     """
     缓存装饰器
 
+    同时支持同步函数和 async 函数。async 函数在缓存未命中时按键做
+    single-flight：同一键的并发调用只执行一次，其余调用等待同一结果。
+
     Args:
         category: 缓存类别
-        key_func: 生成缓存键的函数，接收与被装饰函数相同的参数
+        key_func: 生成缓存键的函数，接收与被装饰函数相同的参数。
+            未指定时对参数做 JSON 序列化后哈希，参数需可 JSON 序列化
+            (其他对象按 str() 处理)
         ttl_seconds: TTL 秒数
 
     Example:
@@ -328,26 +639,47 @@ def cached(category: str, key_func=None, ttl_seconds: Optional[int] = None):
         async def search(query: str):
             ...
     """
+    def make_identifier(args, kwargs) -> str:
+        """生成缓存键"""
+        if key_func:
+            return key_func(*args, **kwargs)
+        return xxhash.xxh3_64_hexdigest(
+            orjson.dumps((args, sorted(kwargs.items())), default=str)
+        )
+
     def decorator(func):
+        if not asyncio.iscoroutinefunction(func):
+            @functools.wraps(func)
+            def sync_wrapper(*args, **kwargs):
+                identifier = make_identifier(args, kwargs)
+
+                cached_value = cache_get(category, identifier)
+                if cached_value is not None:
+                    return cached_value
+
+                result = func(*args, **kwargs)
+                cache_set(category, identifier, result, ttl_seconds)
+                return result
+
+            return sync_wrapper
+
+        @functools.wraps(func)
         async def wrapper(*args, **kwargs):
-            # 生成缓存键
-            if key_func:
-                identifier = key_func(*args, **kwargs)
-            else:
-                identifier = str(args) + str(kwargs)
+            identifier = make_identifier(args, kwargs)
 
             # 尝试从缓存获取
             cached_value = cache_get(category, identifier)
             if cached_value is not None:
                 return cached_value
 
-            # 执行函数
-            result = await func(*args, **kwargs)
-
-            # 写入缓存
-            cache_set(category, identifier, result, ttl_seconds)
+            async def call():
+                # 执行函数并写入缓存
+                result = await func(*args, **kwargs)
+                await cache_aset(category, identifier, result, ttl_seconds)
+                return result
 
-            return result
+            # 相同请求已在进行中时等待其结果
+            return await single_flight((category, identifier), call)
 
         return wrapper
     return decorator
@@ -6,17 +6,28 @@ API文档: https://info.gbiz.go.jp/hojin/swagger-ui.html
 """
 import asyncio
 import logging
+from functools import lru_cache
 from typing import Optional
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 
 import httpx
 
 from ..config import get_config, GBizInfoConfig
+from .cache import cache_aset, cache_get
+from .retry import backoff_delay
 
 logger = logging.getLogger(__name__)
 
+# 连接池上限
+MAX_CONNECTIONS = 200
+MAX_KEEPALIVE_CONNECTIONS = 50
+# 传输层 (连接失败) 重试次数
+TRANSPORT_RETRIES = 3
+# get_many 结果缓存类别
+CACHE_CATEGORY = "gbizinfo"
 
-@dataclass
+
+@dataclass(slots=True)
 class GBizInfoData:
     """gBizINFO 返回的企业数据"""
     # 基本信息
@@ -52,26 +63,85 @@ class GBizInfoData:
     error: Optional[str] = None
 
 
+# ============================================================
+# 模块级共享 HTTP 客户端
+# ============================================================
+
+_module_client: Optional[httpx.AsyncClient] = None
+_module_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_module_client(cfg: GBizInfoConfig) -> httpx.AsyncClient:
+    """
+    获取模块级共享客户端 (连接池 + HTTP/2)，多次查询复用连接，省去握手
+
+    客户端绑定到创建时的事件循环，循环变化时重新创建。
+    API Token 与超时随每个请求发送 (见 GBizInfoClient._request_kwargs)，不同配置可共用同一连接池。
+    """
+    global _module_client, _module_client_loop
+    loop = asyncio.get_running_loop()
+    if _module_client is None or _module_client.is_closed or _module_client_loop is not loop:
+        limits = httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        )
+        _module_client = httpx.AsyncClient(
+            timeout=cfg.timeout,
+            headers={"Accept": "application/json"},
+            transport=httpx.AsyncHTTPTransport(
+                http2=True, limits=limits, retries=TRANSPORT_RETRIES
+            ),
+        )
+        _module_client_loop = loop
+    return _module_client
+
+
+async def aclose_module_client():
+    """关闭模块级共享客户端 (进程退出前调用)"""
+    global _module_client, _module_client_loop
+    if _module_client is not None:
+        await _module_client.aclose()
+    _module_client = None
+    _module_client_loop = None
+
+
 class GBizInfoClient:
     """gBizINFO API 客户端"""
 
-    def __init__(self, config: Optional[GBizInfoConfig] = None):
+    def __init__(
+        self,
+        config: Optional[GBizInfoConfig] = None,
+        shared: bool = True,
+    ):
+        """
+        Args:
+            config: gBizINFO 配置
+            shared: 是否使用模块级共享客户端 (False 则每个上下文独立建连)
+        """
         self.config = config or get_config().gbizinfo
+        self.shared = shared
         self._client: Optional[httpx.AsyncClient] = None
+        # 共享客户端不带 Token，按本实例的配置逐请求发送
+        self._request_kwargs = {
+            "headers": {"X-hojinInfo-api-token": self.config.api_token},
+            "timeout": self.config.timeout,
+        }
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(
-            timeout=self.config.timeout,
-            headers={
-                "X-hojinInfo-api-token": self.config.api_token,
-                "Accept": "application/json",
-            },
-        )
+        if self.shared:
+            self._client = _get_module_client(self.config)
+        else:
+            self._client = httpx.AsyncClient(
+                timeout=self.config.timeout,
+                headers={"Accept": "application/json"},
+            )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._client:
+        # 共享客户端由模块管理，不在此关闭
+        if self._client and not self.shared:
             await self._client.aclose()
+        self._client = None
 
     @property
     def client(self) -> httpx.AsyncClient:
@@ -100,7 +170,7 @@ class GBizInfoClient:
 
         for attempt in range(self.config.max_retries):
             try:
-                response = await self.client.get(url)
+                response = await self.client.get(url, **self._request_kwargs)
                 response.raise_for_status()
                 data = response.json()
 
@@ -146,7 +216,7 @@ class GBizInfoClient:
                         corporate_number=corporate_number,
                         error=f"HTTP error: {e.response.status_code}"
                     )
-                await asyncio.sleep(2 ** attempt)
+                await asyncio.sleep(backoff_delay(attempt))
 
             except Exception as e:
                 logger.error(f"gBizINFO API error (attempt {attempt + 1}): {e}")
@@ -155,13 +225,49 @@ class GBizInfoClient:
                         corporate_number=corporate_number,
                         error=str(e)
                     )
-                await asyncio.sleep(2 ** attempt)
+                await asyncio.sleep(backoff_delay(attempt))
 
         return GBizInfoData(
             corporate_number=corporate_number,
             error="Max retries exceeded"
         )
 
+    async def get_many(self, corporate_numbers: list[str]) -> list[GBizInfoData]:
+        """
+        并发批量获取企业信息
+
+        先查缓存，未命中的法人番号以 config.max_concurrency 为上限并发请求；
+        成功的结果写入缓存。
+
+        Args:
+            corporate_numbers: 法人番号列表
+
+        Returns:
+            与输入顺序一致的 GBizInfoData 列表
+        """
+        sem = asyncio.Semaphore(self.config.max_concurrency)
+        ttl_seconds = get_config().cache.basic_info_ttl
+
+        async def _one(corporate_number: str) -> GBizInfoData:
+            cached_data = cache_get(CACHE_CATEGORY, corporate_number)
+            if cached_data is not None:
+                return GBizInfoData(**cached_data)
+
+            async with sem:
+                data = await self.get_by_corporate_number(corporate_number)
+
+            if not data.error:
+                await cache_aset(CACHE_CATEGORY, corporate_number, asdict(data), ttl_seconds)
+            return data
+
+        results = await asyncio.gather(
+            *(_one(n) for n in corporate_numbers), return_exceptions=True
+        )
+        return [
+            r if isinstance(r, GBizInfoData) else GBizInfoData(corporate_number=n, error=str(r))
+            for n, r in zip(corporate_numbers, results)
+        ]
+
     async def search_by_name(
         self,
         name: str,
@@ -185,7 +291,7 @@ class GBizInfoClient:
 
         for attempt in range(self.config.max_retries):
             try:
-                response = await self.client.get(url, params=params)
+                response = await self.client.get(url, params=params, **self._request_kwargs)
                 response.raise_for_status()
                 data = response.json()
 
@@ -206,21 +312,25 @@ class GBizInfoClient:
                 logger.warning(f"gBizINFO search API HTTP error (attempt {attempt + 1}): {e}")
                 if attempt == self.config.max_retries - 1:
                     return [GBizInfoData(error=f"HTTP error: {e.response.status_code}")]
-                await asyncio.sleep(2 ** attempt)
+                await asyncio.sleep(backoff_delay(attempt))
 
             except Exception as e:
                 logger.error(f"gBizINFO search API error (attempt {attempt + 1}): {e}")
                 if attempt == self.config.max_retries - 1:
                     return [GBizInfoData(error=str(e))]
-                await asyncio.sleep(2 ** attempt)
+                await asyncio.sleep(backoff_delay(attempt))
 
         return [GBizInfoData(error="Max retries exceeded")]
 
     @staticmethod
     def _parse_int(value) -> Optional[int]:
-        """安全解析整数"""
+        """安全解析整数 (常见的 int / 纯数字字符串走快速路径，不触发异常)"""
         if value is None:
             return None
+        if type(value) is int:
+            return value
+        if isinstance(value, str) and (value[1:] if value[:1] == "-" else value).isdecimal():
+            return int(value)
         try:
             return int(value)
         except (ValueError, TypeError):
@@ -260,9 +370,10 @@ async def search_company(name: str, limit: int = 10) -> list[GBizInfoData]:
         return await client.search_by_name(name, limit)
 
 
+@lru_cache(maxsize=4096)
 def format_capital(capital: Optional[int]) -> Optional[str]:
     """
-    格式化资本金显示
+    格式化资本金显示 (资本金集中在少数整数档位，结果做缓存)
 
     Args:
         capital: 资本金(日元)
@@ -4,25 +4,91 @@ Gemini API 客户端
 用于 AI 分析和报告生成
 """
 import asyncio
-import json
 import logging
-from typing import Optional, Any
+import re
+from typing import Optional, Any, AsyncIterator
 from dataclasses import dataclass
 
 import httpx
+import orjson
 
 from ..config import get_config, GeminiConfig
+from .cache import cached_response, request_cache_key, single_flight
+from .retry import with_retries
 
 logger = logging.getLogger(__name__)
 
+# 连接池上限
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+# 空闲连接保活时间 (秒)，HTTP/2 下一条连接承载多路并发请求
+KEEPALIVE_EXPIRY = 30.0
 
-@dataclass
+# generate_batch 每个请求最多合并的 prompt 数
+# (默认输出上限 8192 token，按每项约 1K token 估算)
+BATCH_MAX_ITEMS = 8
+
+# markdown 代码块 (```json ... ```)，结尾 fence 可缺省
+_FENCE_RE = re.compile(r'^\s*```(?:json)?\s*(.*?)\s*(?:```)?\s*$', re.DOTALL)
+# } 或 ] 前多余的逗号；先整体匹配字符串字面量，使其中的 ", }" 原样保留
+_TRAILING_COMMA_RE = re.compile(r'("(?:[^"\\]|\\.)*")|,\s*([}\]])', re.DOTALL)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """去掉 JSON 中 } / ] 前多余的逗号，字符串值内部不做改动"""
+    return _TRAILING_COMMA_RE.sub(lambda m: m.group(1) or m.group(2), text)
+
+
+@dataclass(slots=True)
 class GeminiResponse:
     """Gemini API 响应"""
     text: str
     model: str
     usage: Optional[dict] = None
     error: Optional[str] = None
+    stale: bool = False  # 上游失败时返回的过期缓存
+
+
+# ============================================================
+# 模块级共享 HTTP 客户端
+# ============================================================
+
+_module_client: Optional[httpx.AsyncClient] = None
+_module_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_module_client(cfg: GeminiConfig) -> httpx.AsyncClient:
+    """
+    获取模块级共享客户端 (连接池 + HTTP/2)，多次调用复用 keep-alive 连接
+
+    客户端绑定到创建时的事件循环，循环变化时重新创建。
+    """
+    global _module_client, _module_client_loop
+    loop = asyncio.get_running_loop()
+    if _module_client is None or _module_client.is_closed or _module_client_loop is not loop:
+        _module_client = httpx.AsyncClient(
+            timeout=cfg.timeout,
+            headers={
+                "Content-Type": "application/json",
+            },
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            http2=True,
+        )
+        _module_client_loop = loop
+    return _module_client
+
+
+async def aclose_module_client():
+    """关闭模块级共享客户端 (进程退出前调用)"""
+    global _module_client, _module_client_loop
+    if _module_client is not None:
+        await _module_client.aclose()
+    _module_client = None
+    _module_client_loop = None
 
 
 class GeminiClient:
@@ -30,28 +96,114 @@ class GeminiClient:
 
     BASE_URL = "https://generativelanguage.googleapis.com/v1beta"
 
-    def __init__(self, config: Optional[GeminiConfig] = None):
+    def __init__(
+        self,
+        config: Optional[GeminiConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Args:
+            config: Gemini 配置
+            client: 外部注入的 httpx 客户端 (由调用方负责关闭)，默认使用模块级共享客户端
+            use_cache: 是否缓存生成响应
+        """
         self.config = config or get_config().gemini
-        self._client: Optional[httpx.AsyncClient] = None
+        self._client = client
+        self.use_cache = use_cache
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(
-            timeout=self.config.timeout,
-            headers={
-                "Content-Type": "application/json",
-            },
-        )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._client:
-            await self._client.aclose()
+        # 共享客户端由模块管理，注入的客户端由调用方管理，均不在此关闭
+        pass
 
     @property
     def client(self) -> httpx.AsyncClient:
-        if self._client is None:
-            raise RuntimeError("Client not initialized. Use 'async with GeminiClient()' context manager.")
-        return self._client
+        return self._client or _get_module_client(self.config)
+
+    def _build_body(
+        self,
+        prompt: str,
+        system_instruction: Optional[str],
+        temperature: Optional[float],
+        max_tokens: int,
+        response_mime_type: Optional[str],
+        response_schema: Optional[dict] = None,
+    ) -> dict[str, Any]:
+        """构建 generateContent 请求体"""
+        contents = [{"parts": [{"text": prompt}]}]
+
+        generation_config = {
+            "temperature": temperature or self.config.temperature,
+            "maxOutputTokens": max_tokens,
+        }
+
+        if response_mime_type:
+            generation_config["responseMimeType"] = response_mime_type
+
+        if response_schema:
+            generation_config["responseSchema"] = response_schema
+
+        body: dict[str, Any] = {
+            "contents": contents,
+            "generationConfig": generation_config,
+        }
+
+        if system_instruction:
+            body["systemInstruction"] = {
+                "parts": [{"text": system_instruction}]
+            }
+
+        return body
+
+    async def _stream_chunks(self, body: dict[str, Any]) -> AsyncIterator[dict]:
+        """
+        调用 streamGenerateContent (SSE)，逐个产出已解析的响应块
+
+        每个块与 generateContent 的响应结构相同，仅包含增量文本。
+        """
+        url = f"{self.BASE_URL}/models/{self.config.model_name}:streamGenerateContent"
+        params = {"key": self.config.api_key, "alt": "sse"}
+
+        async with self.client.stream(
+            "POST", url, params=params, content=orjson.dumps(body)
+        ) as response:
+            logger.debug(f"Gemini API {response.http_version} {response.status_code}")
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.startswith("data:"):
+                    yield orjson.loads(line[5:])
+
+    async def stream(
+        self,
+        prompt: str,
+        system_instruction: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_tokens: int = 8192,
+        response_mime_type: Optional[str] = None,
+    ) -> AsyncIterator[str]:
+        """
+        流式生成文本，模型每产出一段即 yield
+
+        不经过缓存和重试；HTTP 错误直接抛出 httpx.HTTPStatusError。
+
+        Args:
+            同 generate()
+
+        Yields:
+            增量文本片段
+        """
+        body = self._build_body(
+            prompt, system_instruction, temperature, max_tokens, response_mime_type
+        )
+        async for chunk in self._stream_chunks(body):
+            for candidate in chunk.get("candidates", [])[:1]:
+                for part in candidate.get("content", {}).get("parts", []):
+                    text = part.get("text")
+                    if text:
+                        yield text
 
     async def generate(
         self,
@@ -60,6 +212,7 @@ class GeminiClient:
         temperature: Optional[float] = None,
         max_tokens: int = 8192,
         response_mime_type: Optional[str] = None,
+        response_schema: Optional[dict] = None,
     ) -> GeminiResponse:
         """
         生成文本
@@ -70,85 +223,91 @@ class GeminiClient:
             temperature: 温度参数
             max_tokens: 最大输出token数
             response_mime_type: 响应MIME类型 (如 "application/json")
+            response_schema: 响应 JSON Schema (需配合 application/json)
 
         Returns:
             GeminiResponse
         """
-        url = f"{self.BASE_URL}/models/{self.config.model_name}:generateContent"
-        params = {"key": self.config.api_key}
-
-        # 构建请求体
-        contents = [{"parts": [{"text": prompt}]}]
-
-        generation_config = {
-            "temperature": temperature or self.config.temperature,
-            "maxOutputTokens": max_tokens,
-        }
+        body = self._build_body(
+            prompt, system_instruction, temperature, max_tokens, response_mime_type,
+            response_schema,
+        )
 
-        if response_mime_type:
-            generation_config["responseMimeType"] = response_mime_type
+        async def _post() -> dict:
+            # 流式接收后拼装为 generateContent 的响应结构 (缓存格式不变)
+            texts = []
+            has_candidates = False
+            usage = None
+            async for chunk in self._stream_chunks(body):
+                candidates = chunk.get("candidates")
+                if candidates:
+                    has_candidates = True
+                    for part in candidates[0].get("content", {}).get("parts", []):
+                        texts.append(part.get("text", ""))
+                usage = chunk.get("usageMetadata", usage)
+
+            data: dict[str, Any] = {}
+            if has_candidates:
+                data["candidates"] = [{"content": {"parts": [{"text": "".join(texts)}]}}]
+            if usage is not None:
+                data["usageMetadata"] = usage
+            return data
+
+        request_key = request_cache_key(self.config.model_name, body)
+
+        async def _fetch() -> tuple[dict, bool]:
+            if not self.use_cache:
+                return await with_retries(_post, self.config.max_retries, "Gemini API"), False
+
+            cache_config = get_config().cache
+            return await cached_response(
+                "gemini",
+                request_key,
+                lambda: with_retries(_post, self.config.max_retries, "Gemini API"),
+                cache_config.gemini_response_ttl,
+                cache_config.response_stale_ttl,
+            )
 
-        body: dict[str, Any] = {
-            "contents": contents,
-            "generationConfig": generation_config,
-        }
-
-        if system_instruction:
-            body["systemInstruction"] = {
-                "parts": [{"text": system_instruction}]
-            }
+        try:
+            # 相同请求并发时只发一次上游调用
+            data, stale = await single_flight(("gemini", request_key, self.use_cache), _fetch)
+        except httpx.HTTPStatusError as e:
+            return GeminiResponse(
+                text="",
+                model=self.config.model_name,
+                error=f"HTTP error: {e.response.status_code}"
+            )
+        except Exception as e:
+            return GeminiResponse(
+                text="",
+                model=self.config.model_name,
+                error=str(e)
+            )
+
+        # 解析响应
+        candidates = data.get("candidates", [])
+        if not candidates:
+            return GeminiResponse(
+                text="",
+                model=self.config.model_name,
+                error="No candidates in response"
+            )
+
+        content = candidates[0].get("content", {})
+        parts = content.get("parts", [])
+        if len(parts) == 1:
+            # 常见情况 (流式拼装后也只有一段)，省去生成器和拼接
+            text = parts[0].get("text", "")
+        else:
+            text = "".join(part.get("text", "") for part in parts)
 
-        for attempt in range(self.config.max_retries):
-            try:
-                response = await self.client.post(url, params=params, json=body)
-                response.raise_for_status()
-                data = response.json()
-
-                # 解析响应
-                candidates = data.get("candidates", [])
-                if not candidates:
-                    return GeminiResponse(
-                        text="",
-                        model=self.config.model_name,
-                        error="No candidates in response"
-                    )
-
-                content = candidates[0].get("content", {})
-                parts = content.get("parts", [])
-                text = "".join(part.get("text", "") for part in parts)
-
-                usage = data.get("usageMetadata", None)
-
-                return GeminiResponse(
-                    text=text,
-                    model=self.config.model_name,
-                    usage=usage,
-                )
-
-            except httpx.HTTPStatusError as e:
-                logger.warning(f"Gemini API HTTP error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return GeminiResponse(
-                        text="",
-                        model=self.config.model_name,
-                        error=f"HTTP error: {e.response.status_code}"
-                    )
-                await asyncio.sleep(2 ** attempt)
-
-            except Exception as e:
-                logger.error(f"Gemini API error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return GeminiResponse(
-                        text="",
-                        model=self.config.model_name,
-                        error=str(e)
-                    )
-                await asyncio.sleep(2 ** attempt)
+        usage = data.get("usageMetadata", None)
 
         return GeminiResponse(
-            text="",
+            text=text,
             model=self.config.model_name,
-            error="Max retries exceeded"
+            usage=usage,
+            stale=stale,
         )
 
     async def generate_json(
@@ -156,6 +315,7 @@ class GeminiClient:
         prompt: str,
         system_instruction: Optional[str] = None,
         temperature: Optional[float] = None,
+        response_schema: Optional[dict] = None,
     ) -> tuple[Optional[dict], Optional[str]]:
         """
         生成 JSON 格式的响应
@@ -164,6 +324,7 @@ class GeminiClient:
             prompt: 用户提示
             system_instruction: 系统指令
             temperature: 温度参数
+            response_schema: 响应 JSON Schema
 
         Returns:
             (parsed_json, error_message)
@@ -173,31 +334,98 @@ class GeminiClient:
             system_instruction=system_instruction,
             temperature=temperature,
             response_mime_type="application/json",
+            response_schema=response_schema,
         )
 
         if response.error:
             return None, response.error
 
-        try:
-            # 尝试解析 JSON
-            text = response.text.strip()
+        # 处理可能的 markdown 代码块
+        m = _FENCE_RE.match(response.text)
+        text = m.group(1) if m else response.text.strip()
 
-            # 处理可能的 markdown 代码块
-            if text.startswith("```json"):
-                text = text[7:]
-            if text.startswith("```"):
-                text = text[3:]
-            if text.endswith("```"):
-                text = text[:-3]
+        try:
+            return orjson.loads(text), None
+        except orjson.JSONDecodeError:
+            pass
 
-            parsed = json.loads(text.strip())
-            return parsed, None
+        try:
+            # 容错: 去掉多余的尾逗号后重试，避免为小瑕疵重新调用 Gemini
+            return orjson.loads(_strip_trailing_commas(text)), None
 
-        except json.JSONDecodeError as e:
+        except orjson.JSONDecodeError as e:
             logger.error(f"Failed to parse JSON response: {e}")
             logger.debug(f"Raw response: {response.text}")
             return None, f"JSON parse error: {e}"
 
+    async def generate_batch(
+        self,
+        prompts: list[str],
+        schema: dict,
+        system_instruction: Optional[str] = None,
+        temperature: Optional[float] = None,
+        max_items: int = BATCH_MAX_ITEMS,
+    ) -> list[Optional[dict]]:
+        """
+        批量生成 JSON: 多个独立 prompt 合并为一次请求，返回数组后按顺序拆回
+
+        超过 max_items 的部分拆成多个请求并发执行；
+        某批返回的数组长度不符或解析失败时，该批退回逐条 generate_json。
+
+        Args:
+            prompts: 提示列表
+            schema: 单项响应的 JSON Schema
+            system_instruction: 系统指令
+            temperature: 温度参数
+            max_items: 每个请求最多合并的 prompt 数
+
+        Returns:
+            与 prompts 一一对应的解析结果，失败项为 None
+        """
+        max_items = max(1, max_items)
+        chunks = await asyncio.gather(*(
+            self._generate_batch_chunk(
+                prompts[i:i + max_items], schema, system_instruction, temperature
+            )
+            for i in range(0, len(prompts), max_items)
+        ))
+        return [item for chunk in chunks for item in chunk]
+
+    async def _generate_batch_chunk(
+        self,
+        prompts: list[str],
+        schema: dict,
+        system_instruction: Optional[str],
+        temperature: Optional[float],
+    ) -> list[Optional[dict]]:
+        """generate_batch 的单个请求"""
+        if len(prompts) > 1:
+            numbered = "\n\n".join(f"{i}. {prompt}" for i, prompt in enumerate(prompts, 1))
+            batch_prompt = (
+                f"以下是 {len(prompts)} 个相互独立的输入。"
+                f"请按顺序为每个输入返回一个 JSON 对象，组成 JSON 数组 (共 {len(prompts)} 项):\n\n"
+                f"{numbered}"
+            )
+            parsed, error = await self.generate_json(
+                batch_prompt,
+                system_instruction,
+                temperature,
+                response_schema={"type": "array", "items": schema},
+            )
+            if isinstance(parsed, list) and len(parsed) == len(prompts):
+                return parsed
+
+            logger.warning(
+                f"Batch generation returned unusable result "
+                f"({error or f'expected {len(prompts)} items'}), falling back to single requests"
+            )
+
+        singles = await asyncio.gather(*(
+            self.generate_json(prompt, system_instruction, temperature, response_schema=schema)
+            for prompt in prompts
+        ))
+        return [parsed for parsed, _ in singles]
+
 
 # ============================================================
 # 便捷函数
@@ -219,11 +447,11 @@ async def analyze_with_gemini(
     Returns:
         GeminiResponse 或 (dict, error)
     """
-    async with GeminiClient() as client:
-        if as_json:
-            return await client.generate_json(prompt, system_instruction)
-        else:
-            return await client.generate(prompt, system_instruction)
+    client = GeminiClient()
+    if as_json:
+        return await client.generate_json(prompt, system_instruction)
+    else:
+        return await client.generate(prompt, system_instruction)
 
 
 if __name__ == "__main__":
@@ -267,6 +495,8 @@ if __name__ == "__main__":
             if error:
                 print(f"错误: {error}")
             else:
-                print(f"解析结果: {json.dumps(result, ensure_ascii=False, indent=2)}")
+                print(f"解析结果: {orjson.dumps(result, option=orjson.OPT_INDENT_2).decode()}")
+
+        await aclose_module_client()
 
     asyncio.run(test())
@@ -0,0 +1,77 @@
+"""
+重试工具
+
+带上限的指数退避 (full jitter) + 可重试状态码判定
+"""
+import asyncio
+import logging
+import random
+from typing import Awaitable, Callable, TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# 退避: base * 2^attempt，上限 cap
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 8.0
+
+# 4xx 中仍值得重试的状态码 (超时 / Too Early / 限流)
+RETRYABLE_4XX = frozenset({408, 425, 429})
+
+
+def backoff_delay(attempt: int, base: float = BACKOFF_BASE, cap: float = BACKOFF_CAP) -> float:
+    """指数退避 + full jitter，并限制上限"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def is_retryable_status(status_code: int) -> bool:
+    """5xx 及 408/425/429 可重试，其余 4xx 直接失败"""
+    if 400 <= status_code < 500:
+        return status_code in RETRYABLE_4XX
+    return True
+
+
+async def with_retries(
+    fn: Callable[[], Awaitable[T]],
+    max_retries: int,
+    label: str,
+    base: float = BACKOFF_BASE,
+    cap: float = BACKOFF_CAP,
+) -> T:
+    """
+    执行 fn()，失败时按退避策略重试
+
+    Args:
+        fn: 无参协程函数
+        max_retries: 最大尝试次数
+        label: 日志前缀 (如 "Serper API")
+        base: 退避基数(秒)
+        cap: 单次退避上限(秒)
+
+    Returns:
+        fn() 的返回值
+
+    Raises:
+        最后一次尝试的异常；不可重试的 HTTP 状态码立即抛出
+    """
+    attempts = max(1, max_retries)
+    for attempt in range(attempts):
+        try:
+            return await fn()
+
+        except httpx.HTTPStatusError as e:
+            logger.warning(f"{label} HTTP error (attempt {attempt + 1}): {e}")
+            if attempt == attempts - 1 or not is_retryable_status(e.response.status_code):
+                raise
+
+        except Exception as e:
+            logger.error(f"{label} error (attempt {attempt + 1}): {e}")
+            if attempt == attempts - 1:
+                raise
+
+        await asyncio.sleep(backoff_delay(attempt, base, cap))
+
+    raise RuntimeError("unreachable")
@@ -5,17 +5,29 @@ Serper API 客户端
 """
 import asyncio
 import logging
+from abc import ABC, abstractmethod
 from typing import Optional
 from dataclasses import dataclass
 
 import httpx
+import orjson
 
 from ..config import get_config, SerperConfig
+from .cache import cached_response, request_cache_key, single_flight
+from .retry import with_retries
 
 logger = logging.getLogger(__name__)
 
+# 连接池上限
+MAX_CONNECTIONS = 100
+MAX_KEEPALIVE_CONNECTIONS = 20
+# 空闲连接保活时间 (秒)，HTTP/2 下一条连接承载多路并发请求
+KEEPALIVE_EXPIRY = 30.0
+# aiohttp 后端的 DNS 缓存时间 (秒)
+DNS_CACHE_TTL = 300
 
-@dataclass
+
+@dataclass(slots=True)
 class SearchResult:
     """搜索结果项"""
     title: str
@@ -24,7 +36,7 @@ class SearchResult:
     position: int
 
 
-@dataclass
+@dataclass(slots=True)
 class SerperResponse:
     """Serper API 响应"""
     query: str
@@ -32,34 +44,180 @@ class SerperResponse:
     total_results: Optional[int] = None
     search_time: Optional[float] = None
     error: Optional[str] = None
+    stale: bool = False  # 上游失败时返回的过期缓存
+
+
+# ============================================================
+# 模块级共享 HTTP 客户端
+# ============================================================
+
+_module_client: Optional[httpx.AsyncClient] = None
+_module_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_module_client(cfg: SerperConfig) -> httpx.AsyncClient:
+    """
+    获取模块级共享客户端 (连接池 + HTTP/2)，多次搜索复用 keep-alive 连接
+
+    客户端绑定到创建时的事件循环，循环变化时重新创建。
+    API Key 与超时随每个请求发送 (见 _Transport)，不同配置可共用同一连接池。
+    """
+    global _module_client, _module_client_loop
+    loop = asyncio.get_running_loop()
+    if _module_client is None or _module_client.is_closed or _module_client_loop is not loop:
+        _module_client = httpx.AsyncClient(
+            timeout=cfg.timeout,
+            headers={"Content-Type": "application/json"},
+            limits=httpx.Limits(
+                max_connections=MAX_CONNECTIONS,
+                max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=KEEPALIVE_EXPIRY,
+            ),
+            http2=True,
+        )
+        _module_client_loop = loop
+    return _module_client
+
+
+_module_session = None  # aiohttp.ClientSession
+_module_session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _get_module_session(cfg: SerperConfig):
+    """
+    获取模块级共享 aiohttp 会话 (SERPER_TRANSPORT=aiohttp 时使用)
+
+    与 httpx 客户端相同，绑定到创建时的事件循环，API Key 与超时随每个请求发送。
+    """
+    global _module_session, _module_session_loop
+    import aiohttp
+
+    loop = asyncio.get_running_loop()
+    if _module_session is None or _module_session.closed or _module_session_loop is not loop:
+        _module_session = aiohttp.ClientSession(
+            timeout=aiohttp.ClientTimeout(total=cfg.timeout),
+            headers={"Content-Type": "application/json"},
+            connector=aiohttp.TCPConnector(
+                limit=MAX_CONNECTIONS,
+                ttl_dns_cache=DNS_CACHE_TTL,
+                keepalive_timeout=KEEPALIVE_EXPIRY,
+            ),
+        )
+        _module_session_loop = loop
+    return _module_session
+
+
+async def aclose_module_client():
+    """关闭模块级共享客户端 (进程退出前调用)"""
+    global _module_client, _module_client_loop, _module_session, _module_session_loop
+    if _module_client is not None:
+        await _module_client.aclose()
+    if _module_session is not None:
+        await _module_session.close()
+    _module_client = None
+    _module_client_loop = None
+    _module_session = None
+    _module_session_loop = None
+
+
+# ============================================================
+# HTTP 传输后端
+# ============================================================
+
+class _Transport(ABC):
+    """发送 JSON POST 并返回解析后的 JSON；非 2xx 抛出 httpx.HTTPStatusError"""
+
+    def __init__(self, cfg: SerperConfig):
+        # 共享客户端不带 API Key，按调用方的配置逐请求发送
+        self.headers = {"X-API-KEY": cfg.api_key}
+        self.timeout = cfg.timeout
+
+    @abstractmethod
+    async def post_json(self, url: str, payload: dict) -> dict:
+        """POST payload (JSON) 到 url，返回解析后的响应 JSON"""
+
+
+class _HttpxTransport(_Transport):
+    """httpx 后端 (默认，HTTP/2)"""
+
+    def __init__(self, cfg: SerperConfig, client: httpx.AsyncClient):
+        super().__init__(cfg)
+        self.client = client
+
+    async def post_json(self, url: str, payload: dict) -> dict:
+        response = await self.client.post(
+            url, content=orjson.dumps(payload), headers=self.headers, timeout=self.timeout
+        )
+        logger.debug(f"Serper {response.http_version} {response.status_code}")
+        response.raise_for_status()
+        return orjson.loads(response.content)
+
+
+class _AiohttpTransport(_Transport):
+    """aiohttp 后端 (高并发扇出时吞吐更高)"""
+
+    def __init__(self, cfg: SerperConfig, session):
+        super().__init__(cfg)
+        self.session = session
+
+    async def post_json(self, url: str, payload: dict) -> dict:
+        import aiohttp
+
+        async with self.session.post(
+            url,
+            data=orjson.dumps(payload),
+            headers=self.headers,
+            timeout=aiohttp.ClientTimeout(total=self.timeout),
+        ) as response:
+            body = await response.read()
+            logger.debug(f"Serper HTTP/{response.version.major}.{response.version.minor} {response.status}")
+            if response.status >= 400:
+                # 转换为 httpx 异常，保持重试判定和错误信息一致
+                request = httpx.Request("POST", url)
+                raise httpx.HTTPStatusError(
+                    f"HTTP {response.status} for url '{url}'",
+                    request=request,
+                    response=httpx.Response(response.status, content=body, request=request),
+                )
+            return orjson.loads(body)
 
 
 class SerperClient:
     """Serper API 客户端"""
 
-    def __init__(self, config: Optional[SerperConfig] = None):
+    def __init__(
+        self,
+        config: Optional[SerperConfig] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        use_cache: bool = True,
+    ):
+        """
+        Args:
+            config: Serper 配置
+            client: 外部注入的 httpx 客户端 (由调用方负责关闭)，默认使用模块级共享客户端
+                (按 config.transport 选择 httpx 或 aiohttp)
+            use_cache: 是否缓存搜索响应
+        """
         self.config = config or get_config().serper
-        self._client: Optional[httpx.AsyncClient] = None
+        self._client = client
+        self.use_cache = use_cache
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(
-            timeout=self.config.timeout,
-            headers={
-                "X-API-KEY": self.config.api_key,
-                "Content-Type": "application/json",
-            },
-        )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        if self._client:
-            await self._client.aclose()
+        # 共享客户端由模块管理，注入的客户端由调用方管理，均不在此关闭
+        pass
 
     @property
     def client(self) -> httpx.AsyncClient:
-        if self._client is None:
-            raise RuntimeError("Client not initialized. Use 'async with SerperClient()' context manager.")
-        return self._client
+        return self._client or _get_module_client(self.config)
+
+    @property
+    def transport(self) -> _Transport:
+        if self._client is None and self.config.transport == "aiohttp":
+            return _AiohttpTransport(self.config, _get_module_session(self.config))
+        return _HttpxTransport(self.config, self.client)
 
     async def search(
         self,
@@ -89,49 +247,33 @@ class SerperClient:
             "hl": language,
         }
 
-        for attempt in range(self.config.max_retries):
-            try:
-                response = await self.client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-
-                results = []
-                for i, item in enumerate(data.get("organic", [])):
-                    results.append(SearchResult(
-                        title=item.get("title", ""),
-                        link=item.get("link", ""),
-                        snippet=item.get("snippet", ""),
-                        position=i + 1,
-                    ))
-
-                return SerperResponse(
-                    query=query,
-                    results=results,
-                    total_results=data.get("searchInformation", {}).get("totalResults"),
-                    search_time=data.get("searchInformation", {}).get("searchTime"),
-                )
-
-            except httpx.HTTPStatusError as e:
-                logger.warning(f"Serper API HTTP error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return SerperResponse(
-                        query=query,
-                        results=[],
-                        error=f"HTTP error: {e.response.status_code}",
-                    )
-                await asyncio.sleep(2 ** attempt)  # 指数退避
-
-            except Exception as e:
-                logger.error(f"Serper API error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return SerperResponse(
-                        query=query,
-                        results=[],
-                        error=str(e),
-                    )
-                await asyncio.sleep(2 ** attempt)
-
-        return SerperResponse(query=query, results=[], error="Max retries exceeded")
+        try:
+            data, stale = await self._fetch("serper_search", url, payload, "Serper API")
+        except httpx.HTTPStatusError as e:
+            return SerperResponse(
+                query=query,
+                results=[],
+                error=f"HTTP error: {e.response.status_code}",
+            )
+        except Exception as e:
+            return SerperResponse(query=query, results=[], error=str(e))
+
+        results = []
+        for i, item in enumerate(data.get("organic", [])):
+            results.append(SearchResult(
+                title=item.get("title", ""),
+                link=item.get("link", ""),
+                snippet=item.get("snippet", ""),
+                position=i + 1,
+            ))
+
+        return SerperResponse(
+            query=query,
+            results=results,
+            total_results=data.get("searchInformation", {}).get("totalResults"),
+            search_time=data.get("searchInformation", {}).get("searchTime"),
+            stale=stale,
+        )
 
     async def search_news(
         self,
@@ -161,53 +303,92 @@ class SerperClient:
             "hl": language,
         }
 
-        for attempt in range(self.config.max_retries):
-            try:
-                response = await self.client.post(url, json=payload)
-                response.raise_for_status()
-                data = response.json()
-
-                results = []
-                for i, item in enumerate(data.get("news", [])):
-                    results.append(SearchResult(
-                        title=item.get("title", ""),
-                        link=item.get("link", ""),
-                        snippet=item.get("snippet", ""),
-                        position=i + 1,
-                    ))
-
-                return SerperResponse(
-                    query=query,
-                    results=results,
-                )
+        try:
+            data, stale = await self._fetch("serper_news", url, payload, "Serper News API")
+        except httpx.HTTPStatusError as e:
+            return SerperResponse(
+                query=query,
+                results=[],
+                error=f"HTTP error: {e.response.status_code}",
+            )
+        except Exception as e:
+            return SerperResponse(query=query, results=[], error=str(e))
+
+        results = []
+        for i, item in enumerate(data.get("news", [])):
+            results.append(SearchResult(
+                title=item.get("title", ""),
+                link=item.get("link", ""),
+                snippet=item.get("snippet", ""),
+                position=i + 1,
+            ))
+
+        return SerperResponse(
+            query=query,
+            results=results,
+            stale=stale,
+        )
+
+    async def _fetch(
+        self,
+        category: str,
+        url: str,
+        payload: dict,
+        label: str,
+    ) -> tuple[dict, bool]:
+        """
+        发送请求 (带重试)，启用缓存时先查响应缓存
+
+        相同请求并发时只发一次上游调用。
+
+        Returns:
+            (响应 JSON, 是否为过期缓存)
+        """
+        transport = self.transport
 
-            except httpx.HTTPStatusError as e:
-                logger.warning(f"Serper News API HTTP error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return SerperResponse(
-                        query=query,
-                        results=[],
-                        error=f"HTTP error: {e.response.status_code}",
-                    )
-                await asyncio.sleep(2 ** attempt)
-
-            except Exception as e:
-                logger.error(f"Serper News API error (attempt {attempt + 1}): {e}")
-                if attempt == self.config.max_retries - 1:
-                    return SerperResponse(
-                        query=query,
-                        results=[],
-                        error=str(e),
-                    )
-                await asyncio.sleep(2 ** attempt)
-
-        return SerperResponse(query=query, results=[], error="Max retries exceeded")
+        async def _post() -> dict:
+            return await transport.post_json(url, payload)
+
+        request_key = request_cache_key(category, payload)
+
+        async def _load() -> tuple[dict, bool]:
+            if not self.use_cache:
+                return await with_retries(_post, self.config.max_retries, label), False
+
+            cache_config = get_config().cache
+            ttl_seconds = (
+                cache_config.serper_news_ttl if category == "serper_news"
+                else cache_config.serper_search_ttl
+            )
+            return await cached_response(
+                category,
+                request_key,
+                lambda: with_retries(_post, self.config.max_retries, label),
+                ttl_seconds,
+                cache_config.response_stale_ttl,
+            )
+
+        return await single_flight((category, request_key, self.use_cache), _load)
 
 
 # ============================================================
 # 便捷函数
 # ============================================================
 
+# search_company_info 查询模板 (模块加载时构建一次，{name} 为企业名称)
+_QUERY_TEMPLATES = {
+    "executives": "{name} 役員 OR 経営陣 OR 代表取締役",
+    "organization": "{name} 組織図 OR 部署 OR 体制",
+    "funding": "{name} 資金調達 OR 融資 OR 出資",
+    "news": "{name} 2024 OR 2025 ニュース",
+    "hiring": "{name} 採用 OR 求人 OR 募集",
+    "partnership": "{name} 提携 OR 協業 OR パートナーシップ",
+}
+
+# search_company_info 支持的查询类型
+QUERY_TYPES = tuple(_QUERY_TEMPLATES)
+
+
 async def search_company_info(company_name: str, query_type: str) -> SerperResponse:
     """
     搜索企业信息的便捷函数
@@ -219,42 +400,86 @@ async def search_company_info(company_name: str, query_type: str) -> SerperRespo
     Returns:
         SerperResponse
     """
-    query_templates = {
-        "executives": f"{company_name} 役員 OR 経営陣 OR 代表取締役",
-        "organization": f"{company_name} 組織図 OR 部署 OR 体制",
-        "funding": f"{company_name} 資金調達 OR 融資 OR 出資",
-        "news": f"{company_name} 2024 OR 2025 ニュース",
-        "hiring": f"{company_name} 採用 OR 求人 OR 募集",
-        "partnership": f"{company_name} 提携 OR 協業 OR パートナーシップ",
-    }
-
-    query = query_templates.get(query_type, f"{company_name} {query_type}")
-
-    async with SerperClient() as client:
-        if query_type == "news":
-            return await client.search_news(query)
-        else:
-            return await client.search(query)
+    template = _QUERY_TEMPLATES.get(query_type)
+    query = template.format(name=company_name) if template else f"{company_name} {query_type}"
+
+    client = SerperClient()
+    if query_type == "news":
+        return await client.search_news(query)
+    else:
+        return await client.search(query)
 
 
-async def batch_search(queries: list[str], delay: float = 0.5) -> list[SerperResponse]:
+async def search_company_info_all(
+    company_name: str,
+    query_types: Optional[list[str]] = None,
+) -> dict[str, SerperResponse]:
     """
-    批量搜索
+    并发执行多个类型的企业信息搜索
+
+    Args:
+        company_name: 企业名称
+        query_types: 查询类型列表，默认全部类型
+
+    Returns:
+        {query_type: SerperResponse}
+    """
+    query_types = query_types or list(QUERY_TYPES)
+    results = await asyncio.gather(
+        *(search_company_info(company_name, t) for t in query_types)
+    )
+    return dict(zip(query_types, results))
+
+
+async def batch_search(
+    queries: list[str],
+    concurrency: int = 8,
+    rps: Optional[float] = None,
+) -> list[SerperResponse]:
+    """
+    批量搜索 (并发执行)
 
     Args:
         queries: 查询列表
-        delay: 请求间隔(秒)
+        concurrency: 最大并发请求数
+        rps: 每秒最多发起的请求数，None 表示不限速
 
     Returns:
-        搜索结果列表
+        与 queries 顺序一致的搜索结果列表
     """
-    results = []
-    async with SerperClient() as client:
-        for query in queries:
-            result = await client.search(query)
-            results.append(result)
-            await asyncio.sleep(delay)
-    return results
+    client = SerperClient()
+    sem = asyncio.Semaphore(concurrency)
+    limiter = _RateLimiter(rps) if rps else None
+
+    async def _one(query: str) -> SerperResponse:
+        async with sem:
+            if limiter:
+                await limiter.acquire()
+            return await client.search(query)
+
+    results = await asyncio.gather(*(_one(q) for q in queries), return_exceptions=True)
+    return [
+        r if isinstance(r, SerperResponse) else SerperResponse(query=q, results=[], error=str(r))
+        for q, r in zip(queries, results)
+    ]
+
+
+class _RateLimiter:
+    """简单限速器: 保证相邻两次 acquire 的间隔不小于 1/rps 秒"""
+
+    def __init__(self, rps: float):
+        self._interval = 1.0 / rps
+        self._next_at = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            now = loop.time()
+            if self._next_at > now:
+                await asyncio.sleep(self._next_at - now)
+                now = self._next_at
+            self._next_at = now + self._interval
 
 
 if __name__ == "__main__":
@@ -274,4 +499,6 @@ if __name__ == "__main__":
                 print(f"    {r.link}")
                 print()
 
+        await aclose_module_client()
+
     asyncio.run(test())
@@ -1,10 +1,16 @@
 """
 验证器
 """
-from .quality_checker import QualityChecker, QualityCheckResult, check_report_quality
+from .quality_checker import (
+    QualityChecker,
+    QualityCheckResult,
+    check_report_quality,
+    check_reports_quality,
+)
 
 __all__ = [
     "QualityChecker",
     "QualityCheckResult",
     "check_report_quality",
+    "check_reports_quality",
 ]
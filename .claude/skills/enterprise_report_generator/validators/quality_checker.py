@@ -5,15 +5,61 @@
 """
 import re
 import logging
+from concurrent.futures import ProcessPoolExecutor
 from typing import Optional
+from urllib.parse import urlsplit
 from dataclasses import dataclass, field
 
 from ..models import EnterpriseReport
 
 logger = logging.getLogger(__name__)
 
+# 预编译正则 (模块级单例，避免每次调用重新组装/编译)
+_EMAIL_PATTERN = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
 
-@dataclass
+# 日本电话号码模式
+_PHONE_PATTERN = '|'.join([
+    r'0\d{1,4}-\d{1,4}-\d{4}',  # 固定电话
+    r'0[789]0-\d{4}-\d{4}',      # 手机
+    r'\+81-\d{1,4}-\d{1,4}-\d{4}',  # 国际格式
+])
+
+_LINKEDIN_PATTERN = r'https?://(?:www\.)?linkedin\.com/in/[a-zA-Z0-9-]+'
+
+_EMAIL_RE = re.compile(_EMAIL_PATTERN)
+_LINKEDIN_RE = re.compile(_LINKEDIN_PATTERN)
+
+# 邮箱 / 电话 / LinkedIn URL 合并为一个模式，单次扫描完成替换
+_SENSITIVE_RE = re.compile(
+    f'(?P<email>{_EMAIL_PATTERN})'
+    f'|(?P<phone>{_PHONE_PATTERN})'
+    f'|(?P<linkedin>{_LINKEDIN_PATTERN})'
+)
+
+# 廉价预检: 电话号码必以 "0数字" 或 "+81" 开头
+_PHONE_PROBE_RE = re.compile(r'[0+]\d')
+
+# 命中类型 -> (替换文本, filtered_fields 后缀)
+_SENSITIVE_RULES = {
+    "email": ("[邮箱已隐藏]", "approach_hint"),
+    "phone": ("[电话已隐藏]", "phone"),
+    "linkedin": ("[LinkedIn URL已移除，请使用搜索查询]", "linkedin_url"),
+}
+
+# URL 校验允许的协议
+_URL_SCHEMES = frozenset({"http", "https"})
+
+
+def _may_contain_sensitive(text: str) -> bool:
+    """子串预检，绝大多数无需过滤的文本在此直接跳过正则扫描"""
+    return (
+        "@" in text
+        or "linkedin.com/in/" in text
+        or _PHONE_PROBE_RE.search(text) is not None
+    )
+
+
+@dataclass(slots=True)
 class QualityCheckResult:
     """质量检查结果"""
     passed: bool = True
@@ -38,183 +84,152 @@ class QualityChecker:
     # 最低可公开质量分数
     MIN_QUALITY_SCORE = 60
 
-    def __init__(self):
-        self.result = QualityCheckResult()
-
     def check(self, report: EnterpriseReport) -> QualityCheckResult:
         """
         执行质量检查
 
+        检查器本身无状态 (结果通过参数传递)，同一实例可并发检查多份报告。
+
         Args:
             report: 企业报告
 
         Returns:
             QualityCheckResult
         """
-        self.result = QualityCheckResult()
-        self.result.score = report.meta.quality_score
+        result = QualityCheckResult(score=report.meta.quality_score)
 
         # 1. 法人番号格式校验
-        self._check_corporate_number(report.layer1_basic_info.corporate_number)
+        self._check_corporate_number(report.layer1_basic_info.corporate_number, result)
 
         # 2. 必填字段完整性
-        self._check_required_fields(report)
+        self._check_required_fields(report, result)
 
         # 3. URL 有效性
-        self._check_urls(report)
+        self._check_urls(report, result)
 
         # 4. 过滤敏感信息
-        self._filter_sensitive_info(report)
+        self._filter_sensitive_info(report, result)
 
         # 5. 质量分数阈值
-        self._check_quality_score(report)
+        self._check_quality_score(report, result)
 
         # 设置最终结果
-        self.result.passed = len(self.result.errors) == 0
+        result.passed = len(result.errors) == 0
 
-        return self.result
+        return result
 
-    def _check_corporate_number(self, corporate_number: str):
+    def _check_corporate_number(self, corporate_number: str, result: QualityCheckResult):
         """校验法人番号格式"""
         if not corporate_number:
-            self.result.errors.append("法人番号为空")
+            result.errors.append("法人番号为空")
             return
 
         if len(corporate_number) != 13:
-            self.result.errors.append(f"法人番号长度错误: {len(corporate_number)} (应为13位)")
+            result.errors.append(f"法人番号长度错误: {len(corporate_number)} (应为13位)")
             return
 
         if not corporate_number.isdigit():
-            self.result.errors.append("法人番号包含非数字字符")
+            result.errors.append("法人番号包含非数字字符")
             return
 
         # 校验位检查 (可选，日本法人番号有校验位规则)
         # 这里简化处理，只检查格式
 
-    def _check_required_fields(self, report: EnterpriseReport):
+    def _check_required_fields(self, report: EnterpriseReport, result: QualityCheckResult):
         """检查必填字段"""
         layer1 = report.layer1_basic_info
 
         if not layer1.company_name:
-            self.result.errors.append("企业名称为空")
+            result.errors.append("企业名称为空")
 
         if not layer1.corporate_number:
-            self.result.errors.append("法人番号为空")
+            result.errors.append("法人番号为空")
 
         # 警告级别的缺失
         if not layer1.business_overview:
-            self.result.warnings.append("缺少业务概要")
+            result.warnings.append("缺少业务概要")
 
         if not layer1.representative:
-            self.result.warnings.append("缺少代表人信息")
+            result.warnings.append("缺少代表人信息")
 
-    def _check_urls(self, report: EnterpriseReport):
+    def _check_urls(self, report: EnterpriseReport, result: QualityCheckResult):
         """检查 URL 有效性"""
         layer1 = report.layer1_basic_info
 
         if layer1.website:
             if not self._is_valid_url(layer1.website):
-                self.result.warnings.append(f"官网URL格式无效: {layer1.website}")
+                result.warnings.append(f"官网URL格式无效: {layer1.website}")
 
         # 检查新闻链接
         for news in report.layer3_signals.recent_news:
             if news.url and not self._is_valid_url(news.url):
-                self.result.warnings.append(f"新闻URL格式无效: {news.url}")
-
-    def _filter_sensitive_info(self, report: EnterpriseReport):
-        """过滤敏感信息"""
-        # 检查并过滤个人邮箱
-        self._filter_personal_emails(report)
-
-        # 检查并过滤电话号码
-        self._filter_phone_numbers(report)
-
-        # 检查并过滤 LinkedIn 直接 URL
-        self._filter_linkedin_urls(report)
+                result.warnings.append(f"新闻URL格式无效: {news.url}")
 
-    def _filter_personal_emails(self, report: EnterpriseReport):
-        """过滤个人邮箱"""
-        email_pattern = r'[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}'
-
-        # 检查关键人物的接触建议
-        for kp in report.layer2_sales_approach.key_persons:
-            if kp.approach_hint and re.search(email_pattern, kp.approach_hint):
-                kp.approach_hint = re.sub(email_pattern, "[邮箱已隐藏]", kp.approach_hint)
-                self.result.filtered_fields.append(f"key_person.{kp.name}.approach_hint")
-
-        # 检查接触策略
-        strategy = report.layer2_sales_approach.approach_strategy
-        if strategy and strategy.first_contact_script:
-            if strategy.first_contact_script.body_template:
-                body = strategy.first_contact_script.body_template
-                if re.search(email_pattern, body):
-                    strategy.first_contact_script.body_template = re.sub(
-                        email_pattern, "[邮箱已隐藏]", body
-                    )
-                    self.result.filtered_fields.append("approach_strategy.body_template")
-
-    def _filter_phone_numbers(self, report: EnterpriseReport):
-        """过滤电话号码"""
-        # 日本电话号码模式
-        phone_patterns = [
-            r'0\d{1,4}-\d{1,4}-\d{4}',  # 固定电话
-            r'0[789]0-\d{4}-\d{4}',      # 手机
-            r'\+81-\d{1,4}-\d{1,4}-\d{4}',  # 国际格式
-        ]
-
-        combined_pattern = '|'.join(phone_patterns)
-
-        # 检查关键人物
+    def _filter_sensitive_info(self, report: EnterpriseReport, result: QualityCheckResult):
+        """过滤敏感信息 (邮箱 / 电话 / LinkedIn 直接 URL)"""
         for kp in report.layer2_sales_approach.key_persons:
-            if kp.approach_hint and re.search(combined_pattern, kp.approach_hint):
-                kp.approach_hint = re.sub(combined_pattern, "[电话已隐藏]", kp.approach_hint)
-                self.result.filtered_fields.append(f"key_person.{kp.name}.phone")
+            if kp.approach_hint and _may_contain_sensitive(kp.approach_hint):
+                hits = []
 
-    def _filter_linkedin_urls(self, report: EnterpriseReport):
-        """过滤 LinkedIn 直接 URL"""
-        linkedin_url_pattern = r'https?://(www\.)?linkedin\.com/in/[a-zA-Z0-9-]+'
+                def _replace(m: re.Match) -> str:
+                    replacement, suffix = _SENSITIVE_RULES[m.lastgroup]
+                    if suffix not in hits:
+                        hits.append(suffix)
+                    return replacement
 
-        for kp in report.layer2_sales_approach.key_persons:
-            # 检查 approach_hint
-            if kp.approach_hint and re.search(linkedin_url_pattern, kp.approach_hint):
-                kp.approach_hint = re.sub(
-                    linkedin_url_pattern,
-                    "[LinkedIn URL已移除，请使用搜索查询]",
-                    kp.approach_hint
-                )
-                self.result.filtered_fields.append(f"key_person.{kp.name}.linkedin_url")
+                kp.approach_hint = _SENSITIVE_RE.sub(_replace, kp.approach_hint)
+                for suffix in hits:
+                    result.filtered_fields.append(f"key_person.{kp.name}.{suffix}")
 
             # 确保 linkedin_search_query 不是 URL
-            if kp.linkedin_search_query and re.search(linkedin_url_pattern, kp.linkedin_search_query):
+            query = kp.linkedin_search_query
+            if query and "linkedin.com/in/" in query and _LINKEDIN_RE.search(query):
                 # 转换为搜索查询
                 kp.linkedin_search_query = f"{kp.name} {kp.title or ''}"
-                self.result.filtered_fields.append(f"key_person.{kp.name}.linkedin_search_query")
+                result.filtered_fields.append(f"key_person.{kp.name}.linkedin_search_query")
 
-    def _check_quality_score(self, report: EnterpriseReport):
+        # 检查接触策略 (仅过滤邮箱)
+        strategy = report.layer2_sales_approach.approach_strategy
+        if strategy and strategy.first_contact_script:
+            body = strategy.first_contact_script.body_template
+            if body and "@" in body and _EMAIL_RE.search(body):
+                strategy.first_contact_script.body_template = _EMAIL_RE.sub("[邮箱已隐藏]", body)
+                result.filtered_fields.append("approach_strategy.body_template")
+
+    def _check_quality_score(self, report: EnterpriseReport, result: QualityCheckResult):
         """检查质量分数"""
         if report.meta.quality_score < self.MIN_QUALITY_SCORE:
-            self.result.warnings.append(
+            result.warnings.append(
                 f"质量分数 ({report.meta.quality_score}) 低于阈值 ({self.MIN_QUALITY_SCORE})"
             )
 
     @staticmethod
     def _is_valid_url(url: str) -> bool:
-        """验证 URL 格式"""
-        url_pattern = re.compile(
-            r'^https?://'
-            r'(?:(?:[A-Z0-9](?:[A-Z0-9-]{0,61}[A-Z0-9])?\.)+[A-Z]{2,6}\.?|'
-            r'localhost|'
-            r'\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})'
-            r'(?::\d+)?'
-            r'(?:/?|[/?]\S+)$', re.IGNORECASE
+        """验证 URL 格式 (http/https，主机名为域名、IP 或 localhost)"""
+        # urlsplit 会静默去掉 \t \r \n，空白字符须在解析前拒绝
+        if any(c.isspace() for c in url):
+            return False
+        try:
+            parts = urlsplit(url)
+            parts.port  # 端口非法时抛出 ValueError
+        except ValueError:
+            return False
+        host = parts.hostname
+        return (
+            parts.scheme in _URL_SCHEMES
+            and bool(host)
+            and ("." in host or ":" in host or host == "localhost")
         )
-        return url_pattern.match(url) is not None
 
 
 # ============================================================
 # 便捷函数
 # ============================================================
 
+# 无状态，模块内共享
+_checker = QualityChecker()
+
+
 def check_report_quality(report: EnterpriseReport) -> QualityCheckResult:
     """
     检查报告质量的便捷函数
@@ -225,8 +240,40 @@ def check_report_quality(report: EnterpriseReport) -> QualityCheckResult:
     Returns:
         QualityCheckResult
     """
-    checker = QualityChecker()
-    return checker.check(report)
+    return _checker.check(report)
+
+
+# 每个子进程一次领取的报告数
+CHECK_CHUNK_SIZE = 8
+
+
+def _check_one(report: EnterpriseReport) -> tuple[EnterpriseReport, QualityCheckResult]:
+    """子进程入口: 返回过滤后的报告 (跨进程后原对象不会被修改) 和检查结果"""
+    return report, _checker.check(report)
+
+
+def check_reports_quality(
+    reports: list[EnterpriseReport],
+    max_workers: Optional[int] = None,
+) -> list[tuple[EnterpriseReport, QualityCheckResult]]:
+    """
+    批量检查报告质量 (多进程)
+
+    检查为纯 CPU 计算，按报告分发到进程池并行执行。
+    报告数不超过一个批次时直接在当前进程执行，省去进程启动开销。
+
+    Args:
+        reports: 企业报告列表
+        max_workers: 进程数，默认为 CPU 核数
+
+    Returns:
+        [(过滤后的报告, QualityCheckResult)]，顺序与输入一致
+    """
+    if max_workers == 1 or len(reports) <= CHECK_CHUNK_SIZE:
+        return [_check_one(report) for report in reports]
+
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(_check_one, reports, chunksize=CHECK_CHUNK_SIZE))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,4 @@
+-- 导入完成后更新查询规划统计信息
+-- 由 import_csv_to_sqlite.py 最后一步执行；也可单独运行：sqlite3 data/enterprises.db < scripts/analyze.sql
+ANALYZE;
+PRAGMA optimize;
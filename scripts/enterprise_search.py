@@ -14,11 +14,35 @@ import re
 import os
 import sys
 import argparse
+import threading
 from datetime import datetime
+from functools import lru_cache
+from collections import namedtuple
+from pathlib import Path
+
+try:
+    import ahocorasick  # pyahocorasick（可选）：多关键词单次扫描
+except ImportError:
+    ahocorasick = None
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 DB_PATH = os.path.join(BASE_DIR, "data", "enterprises.db")
 
+# 只读连接的 PRAGMA（检索层不写库）
+READ_PRAGMAS = (
+    "PRAGMA query_only=1",
+    "PRAGMA mmap_size=30000000000",
+    "PRAGMA cache_size=-524288",  # 512MB cache：FTS5 索引与排序时的热 b-tree 页常驻
+    "PRAGMA temp_store=MEMORY",
+)
+
+# 检索依赖的表结构（旧版导入脚本建的库没有这些列/表，需重新导入）
+REQUIRED_COLUMNS = ("has_desc", "established_ymd", "search_text")
+REQUIRED_TABLES = ("enterprises_fts", "enterprises_fts_tri")
+
+# 每线程一条只读连接（conn + 打开时的文件标识 identity），常驻进程内反复检索时复用
+_conn_pool = threading.local()
+
 # 都道府県コード → 名称
 PREFECTURE_MAP = {
     1: "北海道", 2: "青森", 3: "岩手", 4: "宮城", 5: "秋田", 6: "山形", 7: "福島",
@@ -58,6 +82,23 @@ NEGATIVE_SIGNALS = {
     "運用・保守": -1, "運用保守": -1,
 }
 
+# enhancedConditions 命中加减分（weight ≥4 / ≤2）
+ENHANCED_BONUS = 2
+ENHANCED_PENALTY = -1
+
+# 分层（按顺序对应 SQL 中的 bucket 编号 0/1/2）: ★ ≥4 / ◆ 1-3 / ○ ≤0
+BUCKETS = ("high", "medium", "low")
+BUCKET_SQL = "CASE WHEN score >= 4 THEN 0 WHEN score >= 1 THEN 1 ELSE 2 END"
+# 未通过 Layer 2 的行在 SQL 中的分组编号（只用于统计件数）
+GATE_EXCLUDED = 3   # 命中硬排除词
+GATE_UNMATCHED = 4  # 未命中任何正向关键词
+
+# 打分/关键词匹配所用文本（生成列：business_summary + ' ' + business_type）
+SEARCH_TEXT_SQL = "search_text"
+
+# FTS5 排序函数：按列加权的 BM25（houjin_bangou, company_name, search_text）
+FTS_RANK_FUNCTION = "bm25(0.0, 3.0, 2.0)"
+
 # 行业宽匹配关键词（必须命中 ≥1 才进入候选池）
 INDUSTRY_KEYWORDS = {
     "IT": ["IT", "ソフトウェア", "システム", "クラウド", "Web", "デジタル", "AI",
@@ -75,6 +116,55 @@ INDUSTRY_KEYWORDS = {
 }
 
 
+def _db_identity():
+    """数据库文件的 (inode, mtime, 大小)，任一变化即视为文件被替换或改写"""
+    st = os.stat(DB_PATH)
+    return st.st_ino, st.st_mtime_ns, st.st_size
+
+
+def _get_conn():
+    """
+    取当前线程的只读连接（首次调用或数据库文件变化时创建）
+    mode=ro&immutable=1：不加文件锁、跳过日志检查（导入脚本结束时已切回 DELETE 日志模式，不留 WAL）；
+    immutable 连接看不到文件的后续改动，所以每次取连接时比对文件 inode/mtime/大小，变化后重新打开
+    """
+    try:
+        identity = _db_identity()
+    except FileNotFoundError:
+        print(f"错误: 数据库不存在 {DB_PATH}")
+        print("请先运行: python3 scripts/import_csv_to_sqlite.py")
+        sys.exit(1)
+
+    conn = getattr(_conn_pool, "conn", None)
+    if conn is not None and _conn_pool.identity != identity:
+        conn.close()
+        conn = None
+
+    if conn is None:
+        conn = sqlite3.connect(f"{Path(DB_PATH).as_uri()}?mode=ro&immutable=1", uri=True)
+        conn.row_factory = sqlite3.Row
+        for pragma in READ_PRAGMAS:
+            conn.execute(pragma)
+        _check_schema(conn)
+        _conn_pool.conn = conn
+        _conn_pool.identity = identity
+    return conn
+
+
+def _check_schema(conn):
+    """确认数据库由当前版本的导入脚本生成，缺列/缺表时提示重新导入"""
+    # 生成列只出现在 table_xinfo 中（table_info 不列出）
+    columns = {row["name"] for row in conn.execute("PRAGMA table_xinfo(enterprises)")}
+    tables = {row["name"] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    missing = [col for col in REQUIRED_COLUMNS if col not in columns]
+    missing += [table for table in REQUIRED_TABLES if table not in tables]
+    if missing:
+        conn.close()
+        print(f"错误: 数据库结构过旧，缺少 {', '.join(missing)}: {DB_PATH}")
+        print("请重新运行: python3 scripts/import_csv_to_sqlite.py（全量重新导入）")
+        sys.exit(1)
+
+
 def parse_icp_file(filepath):
     """从 ICP 画像 MD 文件中提取筛选条件 JSON"""
     with open(filepath, 'r', encoding='utf-8') as f:
@@ -90,52 +180,106 @@ def parse_icp_file(filepath):
     return json.loads(match.group(1))
 
 
+# Layer 1 范围条件：ICP 条件键 → SQL 片段（按此顺序拼接）
+RANGE_CLAUSES = {
+    # 従業員数
+    "minEmployeeNumber": "employee_count >= ?",
+    "maxEmployeeNumber": "employee_count <= ?",
+    # 資本金
+    "minCapitalStock": "capital >= ?",
+    "maxCapitalStock": "capital <= ?",
+    # 設立年月日（established_ymd = 0 表示缺失，不参与过滤）
+    "minEstablishmentAt": "(established_ymd >= ? OR established_ymd = 0)",
+    "maxEstablishmentAt": "(established_ymd <= ? OR established_ymd = 0)",
+}
+
+# "YYYY-MM-DD" / "YYYY/MM/DD"（允许带时间后缀）
+DATE_RE = re.compile(r'(\d{4})[-/](\d{2})[-/](\d{2})')
+
+
+def date_to_int(value):
+    """日期字符串 → YYYYMMDD 整数（与 established_ymd 同一形式），无法解析返回 None"""
+    match = DATE_RE.match(str(value))
+    return int("".join(match.groups())) if match else None
+
+
+# 需要先转换的范围条件参数
+RANGE_CONVERTERS = {
+    "minEstablishmentAt": date_to_int,
+    "maxEstablishmentAt": date_to_int,
+}
+
+
+@lru_cache(maxsize=256)
+def _where_template(prefecture_count, keys):
+    """
+    按条件形状（都道府県数 + 出现的范围条件键）生成 WHERE 模板
+    同形状的条件复用同一 SQL 字符串，也就命中 sqlite3 的预编译语句缓存
+    """
+    clauses = []
+    if prefecture_count:
+        placeholders = ','.join(['?'] * prefecture_count)
+        clauses.append(f"prefecture_code IN ({placeholders})")
+    clauses.extend(RANGE_CLAUSES[key] for key in keys)
+    return " AND ".join(clauses) if clauses else "1=1"
+
+
 def build_where_clause(conditions):
     """
     Layer 1: 构建结构化 WHERE 子句
     返回 (sql_fragment, params)
     """
-    clauses = []
-    params = []
-
     # 都道府県
     prefecture_ids = conditions.get("prefectureIds", [])
-    if prefecture_ids:
-        placeholders = ','.join(['?'] * len(prefecture_ids))
-        clauses.append(f"prefecture_code IN ({placeholders})")
-        params.extend(prefecture_ids)
+    params = list(prefecture_ids)
 
-    # 従業員数
-    min_emp = conditions.get("minEmployeeNumber")
-    max_emp = conditions.get("maxEmployeeNumber")
-    if min_emp is not None:
-        clauses.append("employee_count >= ?")
-        params.append(min_emp)
-    if max_emp is not None:
-        clauses.append("employee_count <= ?")
-        params.append(max_emp)
+    # 従業員数 / 資本金 / 設立年月日
+    keys = []
+    for key in RANGE_CLAUSES:
+        value = conditions.get(key)
+        if value is None or value == "":
+            continue
+        if key in RANGE_CONVERTERS:
+            converted = RANGE_CONVERTERS[key](value)
+            if converted is None:
+                print(f"警告: 无法解析 {key}={value!r}，忽略该条件")
+                continue
+            value = converted
+        keys.append(key)
+        params.append(value)
 
-    # 資本金
-    min_cap = conditions.get("minCapitalStock")
-    max_cap = conditions.get("maxCapitalStock")
-    if min_cap is not None:
-        clauses.append("capital >= ?")
-        params.append(min_cap)
-    if max_cap is not None:
-        clauses.append("capital <= ?")
-        params.append(max_cap)
-
-    # 設立年月日
-    min_est = conditions.get("minEstablishmentAt")
-    max_est = conditions.get("maxEstablishmentAt")
-    if min_est:
-        clauses.append("(established_date >= ? OR established_date IS NULL OR established_date = '')")
-        params.append(min_est)
-    if max_est:
-        clauses.append("(established_date <= ? OR established_date IS NULL OR established_date = '')")
-        params.append(max_est)
-
-    return " AND ".join(clauses) if clauses else "1=1", params
+    return _where_template(len(prefecture_ids), tuple(keys)), params
+
+
+# trigram 索引能匹配的最短关键词长度（更短的词只能逐行 instr）
+TRIGRAM_MIN_LENGTH = 3
+
+
+@lru_cache(maxsize=64)
+def _keyword_match_template(use_trigram, instr_count):
+    """关键词匹配表达式模板：trigram 子查询（1 个 MATCH 参数）OR instr_count 个 instr 判断"""
+    terms = []
+    if use_trigram:
+        terms.append("rowid IN (SELECT rowid FROM enterprises_fts_tri WHERE enterprises_fts_tri MATCH ?)")
+    terms.extend([f"instr({SEARCH_TEXT_SQL}, ?) > 0"] * instr_count)
+    return f"({' OR '.join(terms) or '0'})"
+
+
+def keyword_match_sql(keywords):
+    """
+    Layer 2: 生成 "search_text 包含任一关键词" 的 SQL 表达式（须用于 FROM enterprises 的查询）
+    ≥3 字的关键词合并成一次 trigram MATCH（case_sensitive 的子串索引），其余逐行 instr；
+    两者都是区分大小写的子串匹配，与 Python 的 `kw in text` 语义一致
+    返回 (sql_fragment, params)
+    """
+    long_keywords = [kw for kw in keywords if len(kw) >= TRIGRAM_MIN_LENGTH]
+    short_keywords = [kw for kw in keywords if len(kw) < TRIGRAM_MIN_LENGTH]
+
+    params = []
+    if long_keywords:
+        params.append(" OR ".join('"%s"' % kw.replace('"', '""') for kw in long_keywords))
+    params.extend(short_keywords)
+    return _keyword_match_template(bool(long_keywords), len(short_keywords)), params
 
 
 def get_positive_keywords(conditions):
@@ -168,28 +312,100 @@ def get_positive_keywords(conditions):
     return list(keywords)
 
 
-def score_enterprise(text, enhanced_conditions=None):
+class KeywordScanner:
+    """
+    关键词扫描器：一次扫描找出文本中出现的全部关键词
+    安装了 pyahocorasick 时使用 Aho–Corasick 自动机，否则使用预编译的正则交替式（同样单次扫描）
+    """
+
+    def __init__(self, keywords):
+        self.keywords = tuple(dict.fromkeys(kw for kw in keywords if kw))
+        self._automaton = None
+        self._pattern = None
+        # 正则模式下补全重叠命中用：关键词 → 包含于它的关键词 / 与它尾首重叠的关键词
+        self._implied = {}
+        self._overlapping = {}
+
+        if not self.keywords:
+            return
+
+        if ahocorasick is not None:
+            self._automaton = ahocorasick.Automaton()
+            for kw in self.keywords:
+                self._automaton.add_word(kw, kw)
+            self._automaton.make_automaton()
+            return
+
+        # 长词优先的交替式；findall 不重叠，被吞掉的重叠命中由下面两张表补全
+        ordered = sorted(self.keywords, key=len, reverse=True)
+        self._pattern = re.compile("|".join(re.escape(kw) for kw in ordered))
+        for kw in self.keywords:
+            # 整个落在 kw 内部的关键词：kw 命中即命中
+            implied = frozenset(other for other in self.keywords if other != kw and other in kw)
+            if implied:
+                self._implied[kw] = implied
+            # 从 kw 内部开始、越过 kw 结尾的关键词（kw 的后缀 = other 的前缀）：需再确认一次
+            overlapping = tuple(
+                other for other in self.keywords
+                if other not in implied and other != kw
+                and any(other.startswith(kw[i:]) for i in range(1, len(kw)))
+            )
+            if overlapping:
+                self._overlapping[kw] = overlapping
+
+    def find(self, text):
+        """返回 text 中出现的关键词集合（含互相重叠的关键词）"""
+        if self._automaton is not None:
+            return {kw for _, kw in self._automaton.iter(text)}
+        if self._pattern is None:
+            return set()
+
+        matched = set(self._pattern.findall(text))
+        hits = set(matched)
+        for kw in matched:
+            implied = self._implied.get(kw)
+            if implied:
+                hits |= implied
+            for other in self._overlapping.get(kw, ()):
+                if other not in hits and other in text:
+                    hits.add(other)
+        return hits
+
+
+def build_signal_scanner(enhanced_conditions=None):
+    """构建 Layer 3 打分用的扫描器（正向/负向信号 + enhancedConditions 关键词）"""
+    keywords = list(POSITIVE_SIGNALS) + list(NEGATIVE_SIGNALS)
+    for cond in enhanced_conditions or []:
+        if isinstance(cond, dict):
+            keywords.append(cond.get("keyword", cond.get("condition", "")))
+    return KeywordScanner(keywords)
+
+
+def score_enterprise(text, enhanced_conditions=None, scanner=None):
     """
     Layer 3: 对企业文本打分
-    text = business_summary + business_type 拼接
+    text = search_text（business_summary + " " + business_type 拼接）
+    scanner: build_signal_scanner() 的结果；批量打分时复用，未传入则现建
     """
     if not text:
         return 0, []
 
+    if scanner is None:
+        scanner = build_signal_scanner(enhanced_conditions)
+    hits = scanner.find(text)
+
     score = 0
     signals = []
 
     # 正向信号（每组只计一次）
-    scored_groups = set()
     for keyword, points in POSITIVE_SIGNALS.items():
-        if keyword in text and keyword not in scored_groups:
+        if keyword in hits:
             score += points
             signals.append(f"+{points}:{keyword}")
-            scored_groups.add(keyword)
 
     # 负向信号
     for keyword, points in NEGATIVE_SIGNALS.items():
-        if keyword in text:
+        if keyword in hits:
             score += points
             signals.append(f"{points}:{keyword}")
 
@@ -199,27 +415,120 @@ def score_enterprise(text, enhanced_conditions=None):
             if isinstance(cond, dict):
                 kw = cond.get("keyword", cond.get("condition", ""))
                 weight = cond.get("weight", 3)
-                if kw and kw in text:
+                if kw and kw in hits:
                     if weight >= 4:
-                        bonus = 2
+                        bonus = ENHANCED_BONUS
                         score += bonus
                         signals.append(f"+{bonus}:enhanced({kw})")
                     elif weight <= 2:
-                        penalty = -1
+                        penalty = ENHANCED_PENALTY
                         score += penalty
                         signals.append(f"{penalty}:low_weight({kw})")
 
     return score, signals
 
 
+@lru_cache(maxsize=64)
+def _score_template(points):
+    """各信号分值 → 打分 SQL 表达式模板：Σ (instr(text, ?) > 0) * 分值"""
+    if not points:
+        return "0"
+    return " + ".join(f"(instr({SEARCH_TEXT_SQL}, ?) > 0) * {p}" for p in points)
+
+
+def score_sql(enhanced_conditions=None):
+    """
+    Layer 3 打分的 SQL 版本，分数与 score_enterprise() 一致（每个信号只计一次）
+    返回 (sql_fragment, params)
+    """
+    keywords = list(POSITIVE_SIGNALS) + list(NEGATIVE_SIGNALS)
+    points = list(POSITIVE_SIGNALS.values()) + list(NEGATIVE_SIGNALS.values())
+
+    # enhancedConditions 加权（weight=3 不影响分数，省略）
+    for cond in enhanced_conditions or []:
+        if isinstance(cond, dict):
+            kw = cond.get("keyword", cond.get("condition", ""))
+            weight = cond.get("weight", 3)
+            if kw and weight >= 4:
+                keywords.append(kw)
+                points.append(ENHANCED_BONUS)
+            elif kw and weight <= 2:
+                keywords.append(kw)
+                points.append(ENHANCED_PENALTY)
+
+    return _score_template(tuple(points)), keywords
+
+
+# search() 取回的列（顺序即结果元组的字段顺序）
+RESULT_COLUMNS = (
+    "houjin_bangou", "company_name", "address", "prefecture",
+    "employee_count", "capital", "representative",
+    "business_summary", "business_type", "website", "established_date",
+)
+
+# search() 的结果行：检索列 + score + signals（直接由行元组拼出，不逐字段复制成字典）
+EnterpriseResult = namedtuple("EnterpriseResult", RESULT_COLUMNS + ("score", "signals"))
+
+
+@lru_cache(maxsize=256)
+def _search_sql(where_clause, exclude_sql, positive_sql, score_expr):
+    """
+    按 WHERE 模板 + 排除/正向关键词表达式 + 打分表达式生成 search() 的单条 CTE 查询
+    参数顺序：排除参数 + 正向参数 + where 参数 + 打分参数 + limit
+    每行为 RESULT_COLUMNS + (search_text, 分组编号, 该分组总件数)
+    """
+    # Layer 2 门控：硬排除 → GATE_EXCLUDED；正向关键词一个都没命中 → GATE_UNMATCHED；通过为 NULL
+    gate_sql = f"WHEN {exclude_sql} THEN {GATE_EXCLUDED}"
+    if positive_sql:
+        gate_sql += f" WHEN NOT {positive_sql} THEN {GATE_UNMATCHED}"
+
+    # 一次扫描 Layer 1 行：门控 + 打分 + 分组，窗口函数同时给出各分组件数和分层 top-K
+    # （分数降序 → 员工数降序 → rowid 升序）；窗口只排序 rowid 等窄列，最后按 rowid 回表取整行
+    # layer1 / scored 带 LIMIT -1 OFFSET 0，阻止 SQLite 展平（否则门控/打分表达式在外层被重复求值）
+    columns = ", ".join(f"e.{col}" for col in RESULT_COLUMNS)
+    return f"""
+        WITH layer1 AS (
+            SELECT rowid AS rid, employee_count, search_text,
+                   CASE {gate_sql} END AS gate
+            FROM enterprises
+            WHERE has_desc = 1 AND {where_clause}
+            LIMIT -1 OFFSET 0
+        ),
+        scored AS (
+            SELECT rid, employee_count, gate,
+                   CASE WHEN gate IS NULL THEN {score_expr} END AS score
+            FROM layer1
+            LIMIT -1 OFFSET 0
+        ),
+        ranked AS (
+            SELECT rid, grp,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY grp
+                       ORDER BY score DESC, coalesce(employee_count, 0) DESC, rid
+                   ) AS rn,
+                   COUNT(*) OVER (PARTITION BY grp) AS grp_count
+            FROM (
+                SELECT rid, employee_count, score, coalesce(gate, {BUCKET_SQL}) AS grp
+                FROM scored
+            )
+        )
+        SELECT {columns}, e.search_text, r.grp, r.grp_count
+        FROM ranked r
+        JOIN enterprises e ON e.rowid = r.rid
+        WHERE r.rn <= CASE WHEN r.grp < {GATE_EXCLUDED} THEN ? ELSE 1 END
+        ORDER BY r.grp, r.rn
+    """
+
+
 def search(conditions, custom_keywords=None, limit=500):
     """
-    三层漏斗检索
+    三层漏斗检索（三层在同一条 SQL 内完成，Python 只为返回的行生成信号说明）
 
     参数:
         conditions: ICP JSON 筛选条件
         custom_keywords: 自定义正向关键词列表（覆盖自动推断）
-        limit: Layer 1 最大返回行数（默认 500，避免内存爆炸）
+        limit: 每个分层（high / medium / low）各自最多返回的条数，不是三层合计的上限
+               （默认 500，避免内存爆炸；stats 中的件数不受限制）
 
     返回:
         {
@@ -228,87 +537,46 @@ def search(conditions, custom_keywords=None, limit=500):
             "low": [...],    # ○ 低匹配 (≤0)
             "stats": {...}
         }
+        各分层元素为 EnterpriseResult（按字段名访问，如 r.company_name / r.score）
+        分层内按 分数降序 → 员工数降序 → 导入顺序（rowid）排列
     """
-    if not os.path.exists(DB_PATH):
-        print(f"错误: 数据库不存在 {DB_PATH}")
-        print("请先运行: python3 scripts/import_csv_to_sqlite.py")
-        sys.exit(1)
-
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-    cur = conn.cursor()
-
     # === Layer 1: 结构化过滤 ===
     where_clause, params = build_where_clause(conditions)
 
-    # 先用结构化条件筛选，同时要求 business_summary 或 business_type 非空
-    sql = f"""
-        SELECT houjin_bangou, company_name, address, prefecture,
-               employee_count, capital, representative,
-               business_summary, business_type, website, established_date
-        FROM enterprises
-        WHERE {where_clause}
-          AND (business_summary IS NOT NULL AND business_summary != ''
-               OR business_type IS NOT NULL AND business_type != '')
-    """
-    cur.execute(sql, params)
-    layer1_results = cur.fetchall()
-    layer1_count = len(layer1_results)
-
-    # === Layer 2: 关键词过滤（正向 + 负向排除） ===
+    # === Layer 2: 关键词门控（负向排除 + 正向至少命中 1 个）===
     positive_keywords = custom_keywords or get_positive_keywords(conditions)
 
-    layer2_results = []
-    excluded_count = 0
-
-    for row in layer1_results:
-        text = (row["business_summary"] or "") + " " + (row["business_type"] or "")
-
-        # 负向硬排除
-        if any(kw in text for kw in HARD_EXCLUDE):
-            excluded_count += 1
-            continue
-
-        # 正向关键词至少命中 1 个
-        if positive_keywords and not any(kw in text for kw in positive_keywords):
-            continue
-
-        layer2_results.append(row)
-
-    layer2_count = len(layer2_results)
-
-    # === Layer 3: 评分排序 ===
+    # === Layer 3: 打分 + 分层 top-K ===
     enhanced = conditions.get("enhancedConditions", [])
-    scored_results = []
-
-    for row in layer2_results:
-        text = (row["business_summary"] or "") + " " + (row["business_type"] or "")
-        score, signals = score_enterprise(text, enhanced)
-        scored_results.append({
-            "houjin_bangou": row["houjin_bangou"],
-            "company_name": row["company_name"],
-            "address": row["address"],
-            "prefecture": row["prefecture"],
-            "employee_count": row["employee_count"],
-            "capital": row["capital"],
-            "representative": row["representative"],
-            "business_summary": row["business_summary"],
-            "business_type": row["business_type"],
-            "website": row["website"],
-            "established_date": row["established_date"],
-            "score": score,
-            "signals": signals,
-        })
-
-    # 按分数降序，同分按员工数降序
-    scored_results.sort(key=lambda x: (x["score"], x["employee_count"] or 0), reverse=True)
-
-    # 分层
-    high = [r for r in scored_results if r["score"] >= 4]
-    medium = [r for r in scored_results if 1 <= r["score"] <= 3]
-    low = [r for r in scored_results if r["score"] <= 0]
-
-    conn.close()
+    exclude_sql, exclude_params = keyword_match_sql(HARD_EXCLUDE)
+    positive_sql, positive_params = keyword_match_sql(positive_keywords) if positive_keywords else (None, [])
+    score_expr, score_params = score_sql(enhanced)
+    sql = _search_sql(where_clause, exclude_sql, positive_sql, score_expr)
+
+    # 行数据取普通元组，直接拼成 EnterpriseResult
+    cur = _get_conn().cursor()
+    cur.row_factory = None
+    cur.execute(sql, [*exclude_params, *positive_params, *params, *score_params, limit])
+
+    # 只对各分层 top-K 的行在 Python 侧生成信号说明（分数与 SQL 一致）
+    scanner = build_signal_scanner(enhanced)
+    ranked = {bucket: [] for bucket in BUCKETS}
+    counts = {}
+    width = len(RESULT_COLUMNS)
+
+    for row in cur:
+        text, grp, grp_count = row[width:]
+        counts[grp] = grp_count
+        if grp >= GATE_EXCLUDED:
+            continue  # 未通过 Layer 2 的分组只取件数
+        score, signals = score_enterprise(text, enhanced, scanner)
+        ranked[BUCKETS[grp]].append(EnterpriseResult(*row[:width], score, signals))
+
+    high, medium, low = (ranked[bucket] for bucket in BUCKETS)
+    bucket_counts = [counts.get(grp, 0) for grp in range(len(BUCKETS))]
+    layer2_count = sum(bucket_counts)
+    excluded_count = counts.get(GATE_EXCLUDED, 0)
+    layer1_count = layer2_count + excluded_count + counts.get(GATE_UNMATCHED, 0)
 
     return {
         "high": high,
@@ -318,10 +586,10 @@ def search(conditions, custom_keywords=None, limit=500):
             "layer1_count": layer1_count,
             "layer2_excluded": excluded_count,
             "layer2_count": layer2_count,
-            "high_count": len(high),
-            "medium_count": len(medium),
-            "low_count": len(low),
-            "total_matched": len(scored_results),
+            "high_count": bucket_counts[0],
+            "medium_count": bucket_counts[1],
+            "low_count": bucket_counts[2],
+            "total_matched": layer2_count,
             "positive_keywords": positive_keywords,
         }
     }
@@ -333,30 +601,32 @@ def fts_search(query_text, prefecture_codes=None, min_emp=None, max_emp=None, li
     当用户输入自然语言描述（如"AI関連の企業"）时使用
 
     参数:
-        query_text: 搜索文本（自动拆分为 OR 查询）
+        query_text: 搜索文本（按空白拆分，各词作为短语 OR 查询）
         prefecture_codes: 都道府県コード列表（可选）
         min_emp/max_emp: 员工数范围（可选）
         limit: 最大返回数
-    """
-    if not os.path.exists(DB_PATH):
-        print(f"错误: 数据库不存在 {DB_PATH}")
-        sys.exit(1)
 
-    conn = sqlite3.connect(DB_PATH)
-    conn.row_factory = sqlite3.Row
-
-    # 构建 FTS5 查询（关键词用 OR 连接）
+    返回的每行额外含 score（加权 BM25，越大越相关）、rank（FTS5 原始 rank，即 -score，越小越相关，
+    兼容旧调用方）和 highlight（命中片段，命中词用【】标出）
+    """
+    # 构建 FTS5 查询：每个词加双引号作为短语（避免 CJK 标点等触发 FTS5 语法错误），用 OR 连接
     terms = query_text.strip().split()
-    fts_query = " OR ".join(terms)
+    if not terms:
+        return []
+    fts_query = " OR ".join('"%s"' % t.replace('"', '""') for t in terms)
 
-    sql = """
+    # rank 使用按列加权的 BM25；score 取反后越大越相关，与 search() 的 score 方向一致（rank 原样保留）
+    sql = f"""
         SELECT e.houjin_bangou, e.company_name, e.address, e.prefecture,
                e.employee_count, e.capital, e.representative,
                e.business_summary, e.business_type, e.website, e.established_date,
-               rank
+               -rank AS score,
+               rank,
+               snippet(enterprises_fts, -1, '【', '】', '…', 16) AS highlight
         FROM enterprises_fts fts
         JOIN enterprises e ON e.rowid = fts.rowid
         WHERE enterprises_fts MATCH ?
+          AND rank MATCH '{FTS_RANK_FUNCTION}'
     """
     params = [fts_query]
 
@@ -376,84 +646,101 @@ def fts_search(query_text, prefecture_codes=None, min_emp=None, max_emp=None, li
     sql += " ORDER BY rank LIMIT ?"
     params.append(limit)
 
-    cur = conn.cursor()
-    cur.execute(sql, params)
+    cur = _get_conn().execute(sql, params)
     results = [dict(row) for row in cur.fetchall()]
-    conn.close()
 
     return results
 
 
-def format_markdown_report(results, conditions, output_path=None):
-    """格式化输出 Markdown 报告"""
-    now = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+# 报告表格行模板：{0}=序号, {1}=EnterpriseResult，其余为预先处理好的显示字段
+MATCH_TABLE_HEADER = (
+    "| # | 企業名 | 従業員数 | 評分 | 信号 | 事業内容 | ウェブサイト | 法人番号 |\n"
+    "|---|--------|----------|------|------|----------|-------------|----------|\n"
+)
+MATCH_ROW_TEMPLATE = "| {0} | {1.company_name} | {2} | {1.score} | {3} | {4} | {5} | {1.houjin_bangou} |\n"
+LOW_TABLE_HEADER = (
+    "| # | 企業名 | 従業員数 | 評分 | 事業内容 | 法人番号 |\n"
+    "|---|--------|----------|------|----------|----------|\n"
+)
+LOW_ROW_TEMPLATE = "| {0} | {1.company_name} | {2} | {1.score} | {3} | {1.houjin_bangou} |\n"
+
+# 低匹配在报告中只显示前 N 件
+LOW_DISPLAY_LIMIT = 20
+
+
+def _match_section(title, rows, total, label):
+    """高/中匹配分节：逐行产出 Markdown 片段"""
+    yield f"## {title}— {total} 件\n\n"
+    if not rows:
+        yield "（无）\n\n"
+        return
+
+    yield MATCH_TABLE_HEADER
+    for i, r in enumerate(rows, 1):
+        yield MATCH_ROW_TEMPLATE.format(
+            i, r, r.employee_count or '-', ", ".join(r.signals[:3]),
+            (r.business_summary or "")[:60], r.website or "",
+        )
+    if len(rows) < total:
+        yield f"\n> {label}共 {total} 件，仅显示前 {len(rows)} 件\n"
+    yield "\n"
+
+
+def _report_chunks(results, conditions, now):
+    """按顺序产出报告的各个片段（每段以换行结尾），供拼接或直接写文件"""
     stats = results["stats"]
 
     # 条件摘要
     prefecture_ids = conditions.get("prefectureIds", [])
     prefecture_names = [PREFECTURE_MAP.get(pid, str(pid)) for pid in prefecture_ids]
-
-    lines = []
-    lines.append("# 客户匹配结果")
-    lines.append(f"> 匹配时间：{now}")
-    lines.append(f"> 数据源：enterprises.db (SQLite + FTS5)")
-    lines.append(f"> 匹配数：{stats['total_matched']} 件（高匹配 {stats['high_count']} 件 + 中匹配 {stats['medium_count']} 件 + 低匹配 {stats['low_count']} 件）")
-    lines.append("")
-    lines.append("## 筛选条件摘要")
-    lines.append(f"- 地域：{', '.join(prefecture_names) if prefecture_names else '全国'}")
-    lines.append(f"- 员工数：{conditions.get('minEmployeeNumber', '无下限')} ~ {conditions.get('maxEmployeeNumber', '无上限')}")
-    lines.append(f"- 正向关键词：{', '.join(stats['positive_keywords'][:10])}{'...' if len(stats['positive_keywords']) > 10 else ''}")
-    lines.append(f"- 硬排除词：{', '.join(HARD_EXCLUDE)}")
-    lines.append(f"- Layer1 结构化过滤：{stats['layer1_count']:,} 件")
-    lines.append(f"- Layer2 排除：{stats['layer2_excluded']} 件（硬排除）")
-    lines.append(f"- Layer2 通过：{stats['layer2_count']} 件")
-    lines.append("")
+    positive_keywords = stats['positive_keywords']
+
+    yield "\n".join([
+        "# 客户匹配结果",
+        f"> 匹配时间：{now}",
+        f"> 数据源：enterprises.db (SQLite + FTS5)",
+        f"> 匹配数：{stats['total_matched']} 件（高匹配 {stats['high_count']} 件 + 中匹配 {stats['medium_count']} 件 + 低匹配 {stats['low_count']} 件）",
+        "",
+        "## 筛选条件摘要",
+        f"- 地域：{', '.join(prefecture_names) if prefecture_names else '全国'}",
+        f"- 员工数：{conditions.get('minEmployeeNumber', '无下限')} ~ {conditions.get('maxEmployeeNumber', '无上限')}",
+        f"- 正向关键词：{', '.join(positive_keywords[:10])}{'...' if len(positive_keywords) > 10 else ''}",
+        f"- 硬排除词：{', '.join(HARD_EXCLUDE)}",
+        f"- Layer1 结构化过滤：{stats['layer1_count']:,} 件",
+        f"- Layer2 排除：{stats['layer2_excluded']} 件（硬排除）",
+        f"- Layer2 通过：{stats['layer2_count']} 件",
+        "",
+        "",
+    ])
 
     # 高匹配
-    lines.append(f"## ★ 高匹配（≥4分）— {stats['high_count']} 件")
-    lines.append("")
-    if results["high"]:
-        lines.append("| # | 企業名 | 従業員数 | 評分 | 信号 | 事業内容 | ウェブサイト | 法人番号 |")
-        lines.append("|---|--------|----------|------|------|----------|-------------|----------|")
-        for i, r in enumerate(results["high"], 1):
-            summary = (r["business_summary"] or "")[:60]
-            signals = ", ".join(r["signals"][:3])
-            website = r["website"] or ""
-            lines.append(f"| {i} | {r['company_name']} | {r['employee_count'] or '-'} | {r['score']} | {signals} | {summary} | {website} | {r['houjin_bangou']} |")
-    else:
-        lines.append("（无）")
-    lines.append("")
+    yield from _match_section("★ 高匹配（≥4分）", results["high"], stats['high_count'], "高匹配")
 
     # 中匹配
-    lines.append(f"## ◆ 中匹配（1-3分）— {stats['medium_count']} 件")
-    lines.append("")
-    if results["medium"]:
-        lines.append("| # | 企業名 | 従業員数 | 評分 | 信号 | 事業内容 | ウェブサイト | 法人番号 |")
-        lines.append("|---|--------|----------|------|------|----------|-------------|----------|")
-        for i, r in enumerate(results["medium"], 1):
-            summary = (r["business_summary"] or "")[:60]
-            signals = ", ".join(r["signals"][:3])
-            website = r["website"] or ""
-            lines.append(f"| {i} | {r['company_name']} | {r['employee_count'] or '-'} | {r['score']} | {signals} | {summary} | {website} | {r['houjin_bangou']} |")
+    yield from _match_section("◆ 中匹配（1-3分）", results["medium"], stats['medium_count'], "中匹配")
+
+    # 低匹配（只显示前 LOW_DISPLAY_LIMIT 件）
+    yield f"## ○ 低匹配（≤0分）— {stats['low_count']} 件\n\n"
+    low = results["low"]
+    if low:
+        yield LOW_TABLE_HEADER
+        for i, r in enumerate(low[:LOW_DISPLAY_LIMIT], 1):
+            yield LOW_ROW_TEMPLATE.format(
+                i, r, r.employee_count or '-', (r.business_summary or "")[:60],
+            )
+        if len(low) > LOW_DISPLAY_LIMIT:
+            yield f"\n> 低匹配共 {stats['low_count']} 件，仅显示前 {LOW_DISPLAY_LIMIT} 件\n"
     else:
-        lines.append("（无）")
-    lines.append("")
-
-    # 低匹配（只显示数量）
-    lines.append(f"## ○ 低匹配（≤0分）— {stats['low_count']} 件")
-    lines.append("")
-    if results["low"]:
-        lines.append("| # | 企業名 | 従業員数 | 評分 | 事業内容 | 法人番号 |")
-        lines.append("|---|--------|----------|------|----------|----------|")
-        for i, r in enumerate(results["low"][:20], 1):  # 低匹配只显示前 20
-            summary = (r["business_summary"] or "")[:60]
-            lines.append(f"| {i} | {r['company_name']} | {r['employee_count'] or '-'} | {r['score']} | {summary} | {r['houjin_bangou']} |")
-        if len(results["low"]) > 20:
-            lines.append(f"\n> 低匹配共 {stats['low_count']} 件，仅显示前 20 件")
-    else:
-        lines.append("（无）")
+        yield "（无）\n"
+
 
-    report = "\n".join(lines)
+def format_markdown_report(results, conditions, output_path=None):
+    """
+    格式化输出 Markdown 报告，返回报告字符串
+    指定 output_path 时同时保存到文件
+    """
+    now = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+    report = "".join(_report_chunks(results, conditions, now))
 
     if output_path:
         os.makedirs(os.path.dirname(output_path), exist_ok=True)
@@ -464,6 +751,18 @@ def format_markdown_report(results, conditions, output_path=None):
     return report
 
 
+def write_markdown_report(results, conditions, output_path):
+    """
+    逐段流式写入 Markdown 报告文件（不在内存中拼出整份报告），内容与 format_markdown_report 相同
+    """
+    now = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+
+    os.makedirs(os.path.dirname(output_path), exist_ok=True)
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.writelines(_report_chunks(results, conditions, now))
+    print(f"报告已保存: {output_path}")
+
+
 def main():
     parser = argparse.ArgumentParser(description="企业检索 — SQLite + FTS5 三层漏斗")
     parser.add_argument("--icp", help="ICP 画像 MD 文件路径")
@@ -471,7 +770,8 @@ def main():
     parser.add_argument("--keywords", help="自定义正向关键词（逗号分隔）")
     parser.add_argument("--fts", help="FTS5 全文搜索文本")
     parser.add_argument("--output", help="输出报告路径")
-    parser.add_argument("--limit", type=int, default=500, help="最大返回数")
+    parser.add_argument("--limit", type=int, default=500,
+                        help="三层漏斗：每个分层最多返回数；--fts：最大返回数")
 
     args = parser.parse_args()
 
@@ -480,7 +780,7 @@ def main():
         results = fts_search(args.fts, limit=args.limit)
         print(f"FTS 搜索结果: {len(results)} 件")
         for r in results[:20]:
-            print(f"  {r['company_name']} | {r['employee_count']} | {r['business_summary'][:50] if r['business_summary'] else ''}")
+            print(f"  {r['company_name']} | {r['employee_count']} | {r['highlight'] or ''}")
         return
 
     # 三层漏斗模式
@@ -508,12 +808,12 @@ def main():
 
     # 输出报告
     if args.output:
-        format_markdown_report(results, conditions, args.output)
+        write_markdown_report(results, conditions, args.output)
     else:
         # 默认输出到 .features/customer-match/data/
         now = datetime.now().strftime("%Y-%m-%d-%H%M%S")
         default_path = os.path.join(BASE_DIR, ".features", "customer-match", "data", f"{now}.md")
-        format_markdown_report(results, conditions, default_path)
+        write_markdown_report(results, conditions, default_path)
 
 
 if __name__ == "__main__":
@@ -6,16 +6,26 @@ CSV → SQLite 导入脚本
 """
 
 import csv
+import io
 import sqlite3
 import os
 import sys
 import time
-import re
+from operator import itemgetter
+
+try:
+    # 可选：PyArrow 多线程 C++ CSV 解析 + 列式清洗，未安装时退回标准库 csv
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pa_csv
+except ImportError:
+    pa = None
 
 # 路径
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 CSV_PATH = os.path.join(BASE_DIR, "data", "Kihonjoho_UTF-8.csv")
 DB_PATH = os.path.join(BASE_DIR, "data", "enterprises.db")
+ANALYZE_SQL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "analyze.sql")
 
 # 只导入有用的列（CSV 列名 → DB 列名）
 COLUMN_MAP = {
@@ -38,30 +48,62 @@ COLUMN_MAP = {
 }
 
 
+class _NonDigitDeleter(dict):
+    """str.translate 用的删除表：ASCII 数字保留，其余字符删除（按需填充，不预建 0x110000 项）"""
+
+    def __missing__(self, codepoint):
+        value = codepoint if 0x30 <= codepoint <= 0x39 else None
+        self[codepoint] = value
+        return value
+
+
+# 非数字字符删除表（与正则 [^0-9] 等价）
+NON_DIGIT_TABLE = _NonDigitDeleter()
+
+# 进度输出间隔（行）
+PROGRESS_INTERVAL = 50000
+
+# PyArrow 每次读取的块大小
+ARROW_BLOCK_SIZE = 64 << 20
+
+
 def clean_number(val):
     """数值字段清洗：去掉非数字字符"""
     if not val:
         return None
-    cleaned = re.sub(r'[^0-9]', '', val)
+    # 多数值本来就是纯 ASCII 数字，直接转换
+    if val.isascii() and val.isdigit():
+        return int(val)
+    cleaned = val.translate(NON_DIGIT_TABLE)
     return int(cleaned) if cleaned else None
 
 
 def clean_prefecture_code(val):
     """都道府県コード清洗：转为整数"""
-    if not val:
-        return None
-    cleaned = re.sub(r'[^0-9]', '', val)
-    return int(cleaned) if cleaned else None
+    return clean_number(val)
+
+
+def clean_text(val):
+    """文本字段清洗：去首尾空白，空串转 None"""
+    return val.strip() or None
+
+
+# 需要特殊清洗的列（其余列按文本处理）
+COLUMN_CLEANERS = {
+    "employee_count": clean_number,
+    "capital": clean_number,
+    "prefecture_code": clean_prefecture_code,
+}
 
 
 def create_tables(conn):
     """建表"""
     cur = conn.cursor()
 
-    # 主表
+    # 主表（houjin_bangou 不设 PRIMARY KEY：导入时免去逐行 b-tree 插入，导入后去重再建唯一索引）
     cur.execute("""
         CREATE TABLE IF NOT EXISTS enterprises (
-            houjin_bangou TEXT PRIMARY KEY,
+            houjin_bangou TEXT,
             company_name TEXT,
             company_name_kana TEXT,
             company_name_en TEXT,
@@ -76,20 +118,47 @@ def create_tables(conn):
             website TEXT,
             business_type TEXT,
             established_date TEXT,
-            updated_date TEXT
+            updated_date TEXT,
+            -- 事業概要 或 事業種目 非空（Layer 1 候选条件，配合部分索引在 b-tree 层跳过无描述企业）
+            has_desc INTEGER GENERATED ALWAYS AS (
+                (business_summary IS NOT NULL AND business_summary <> '')
+                OR (business_type IS NOT NULL AND business_type <> '')
+            ) VIRTUAL,
+            -- 設立年月日的整数形式 YYYYMMDD（缺失或无法解析为 0），供范围过滤走索引
+            established_ymd INTEGER GENERATED ALWAYS AS (
+                CASE WHEN established_date GLOB '[0-9][0-9][0-9][0-9][-/][0-9][0-9][-/][0-9][0-9]*'
+                     THEN CAST(substr(established_date, 1, 4) || substr(established_date, 6, 2)
+                               || substr(established_date, 9, 2) AS INTEGER)
+                     ELSE 0
+                END
+            ) STORED,
+            -- 事業概要 + 事業種目 拼接文本（打分/关键词匹配/FTS 共用，导入时算好一次）
+            search_text TEXT GENERATED ALWAYS AS (
+                coalesce(business_summary, '') || ' ' || coalesce(business_type, '')
+            ) STORED
         )
     """)
 
-    # FTS5 全文检索虚拟表（用于事業概要 + 事業種目 + 商号 的关键词搜索）
+    # FTS5 全文检索虚拟表（用于商号 + search_text（事業概要 + 事業種目）的关键词搜索）
+    # external content 表：索引在主表导入完成后一次性 rebuild
     cur.execute("""
         CREATE VIRTUAL TABLE IF NOT EXISTS enterprises_fts USING fts5(
             houjin_bangou UNINDEXED,
             company_name,
-            business_summary,
-            business_type,
+            search_text,
             content='enterprises',
             content_rowid='rowid',
-            tokenize='unicode61'
+            tokenize='unicode61 remove_diacritics 2'
+        )
+    """)
+
+    # trigram 子串索引（Layer 2 关键词过滤用：≥3 字的关键词走 MATCH，区分大小写，与 instr 语义一致）
+    cur.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS enterprises_fts_tri USING fts5(
+            search_text,
+            content='enterprises',
+            content_rowid='rowid',
+            tokenize='trigram case_sensitive 1'
         )
     """)
 
@@ -104,8 +173,9 @@ def create_indexes(conn):
         ("idx_prefecture_code", "enterprises(prefecture_code)"),
         ("idx_employee_count", "enterprises(employee_count)"),
         ("idx_capital", "enterprises(capital)"),
-        ("idx_established_date", "enterprises(established_date)"),
+        ("idx_established_ymd", "enterprises(established_ymd)"),
         ("idx_prefecture_emp", "enterprises(prefecture_code, employee_count)"),
+        ("idx_pref_hasdesc_emp", "enterprises(prefecture_code, has_desc, employee_count) WHERE has_desc = 1"),
     ]
 
     for idx_name, idx_def in indexes:
@@ -115,18 +185,146 @@ def create_indexes(conn):
     conn.commit()
 
 
-def populate_fts(conn):
-    """填充 FTS5 索引"""
+def dedupe_houjin_bangou(conn):
+    """去掉重复的法人番号（保留最后出现的一行，与原 INSERT OR REPLACE 一致），再批量建唯一索引"""
     cur = conn.cursor()
-    print("  填充 FTS5 全文索引...")
     cur.execute("""
-        INSERT INTO enterprises_fts(rowid, houjin_bangou, company_name, business_summary, business_type)
-        SELECT rowid, houjin_bangou, company_name, business_summary, business_type
-        FROM enterprises
+        DELETE FROM enterprises
+        WHERE rowid IN (
+            SELECT rowid FROM (
+                SELECT rowid, ROW_NUMBER() OVER (
+                    PARTITION BY houjin_bangou ORDER BY rowid DESC
+                ) AS rn
+                FROM enterprises
+                WHERE houjin_bangou IS NOT NULL
+            )
+            WHERE rn > 1
+        )
     """)
+    if cur.rowcount > 0:
+        print(f"  去除重复法人番号: {cur.rowcount:,} 行")
+    cur.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_houjin_bangou ON enterprises(houjin_bangou)")
     conn.commit()
 
 
+def populate_fts(conn):
+    """填充 FTS5 索引：从 content 表批量重建，再合并段"""
+    cur = conn.cursor()
+    for table in ("enterprises_fts", "enterprises_fts_tri"):
+        print(f"  重建 {table}...")
+        cur.execute(f"INSERT INTO {table}({table}) VALUES('rebuild')")
+        print(f"  合并 {table} 索引段...")
+        cur.execute(f"INSERT INTO {table}({table}) VALUES('optimize')")
+    conn.commit()
+
+
+def analyze(conn):
+    """执行 analyze.sql（ANALYZE + PRAGMA optimize），供检索时的查询规划使用"""
+    with open(ANALYZE_SQL_PATH, 'r', encoding='utf-8') as f:
+        conn.executescript(f.read())
+    conn.commit()
+
+
+def make_row_cleaner(indices, db_columns):
+    """返回 原始 CSV 行 → 与 db_columns 对齐的清洗后记录 的函数（列数不足的行补空列，多余列忽略）"""
+    pick = itemgetter(*indices) if len(indices) > 1 else (lambda row: (row[indices[0]],))
+    min_len = max(indices) + 1
+    padding = [""] * min_len
+    cleaners = [COLUMN_CLEANERS.get(db_col, clean_text) for db_col in db_columns]
+
+    def clean_row(row):
+        if len(row) < min_len:
+            row = row + padding[len(row):]
+        return tuple([clean(val) for clean, val in zip(cleaners, pick(row))])
+
+    return clean_row
+
+
+def iter_rows_csv(indices, db_columns):
+    """标准库 csv 逐行解析 + 清洗，产出与 db_columns 对齐的记录"""
+    clean_row = make_row_cleaner(indices, db_columns)
+
+    with open(CSV_PATH, 'r', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        next(reader)  # 跳过 header
+
+        for row in reader:
+            yield clean_row(row)
+
+
+def clean_arrow_column(column, db_col):
+    """PyArrow 列式清洗，语义与 clean_number / clean_text 一致"""
+    if db_col in COLUMN_CLEANERS:
+        digits = pc.replace_substring_regex(column, pattern=r'[^0-9]', replacement='')
+        digits = pc.if_else(pc.equal(digits, ''), pa.scalar(None, pa.string()), digits)
+        return pc.cast(digits, pa.int64())
+
+    text = pc.utf8_trim_whitespace(column)
+    return pc.if_else(pc.equal(text, ''), pa.scalar(None, pa.string()), text)
+
+
+def iter_rows_arrow(csv_columns, indices, db_columns):
+    """
+    PyArrow 按块解析 + 列式清洗，产出与 db_columns 对齐的记录
+    列数不符的行 PyArrow 无法解析，先按行号收下原文，按标准库 csv 路径的规则补齐/截取并清洗后
+    插回原来的位置（行顺序与 csv 路径一致，去重时保留的也是同一行）
+    """
+    clean_row = make_row_cleaner(indices, db_columns)
+    # 数据行序号（header 之后从 0 起）→ 原文；行号未知的记录放在所在块之后
+    invalid = {}
+    unnumbered = []
+    total_invalid = 0
+
+    def collect_invalid(row):
+        nonlocal total_invalid
+        total_invalid += 1
+        if row.number is None:
+            unnumbered.append(row.text)
+        else:
+            invalid[row.number - 2] = row.text  # number 从 1 起且含 header 行
+        return 'skip'
+
+    def repaired(text):
+        return clean_row(next(csv.reader(io.StringIO(text))))
+
+    reader = pa_csv.open_csv(
+        CSV_PATH,
+        read_options=pa_csv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        parse_options=pa_csv.ParseOptions(newlines_in_values=True, invalid_row_handler=collect_invalid),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=csv_columns,
+            column_types={name: pa.string() for name in csv_columns},
+            strings_can_be_null=False,
+            quoted_strings_can_be_null=False,
+        ),
+    )
+
+    position = 0  # 下一条要产出的数据行序号
+    for batch in reader:
+        columns = [
+            clean_arrow_column(batch.column(csv_col), db_col).to_pylist()
+            for csv_col, db_col in zip(csv_columns, db_columns)
+        ]
+        for row in zip(*columns):
+            while position in invalid:
+                yield repaired(invalid.pop(position))
+                position += 1
+            yield row
+            position += 1
+
+        for text in unnumbered:
+            yield repaired(text)
+            position += 1
+        unnumbered.clear()
+
+    # 文件末尾的无效行
+    for number in sorted(invalid):
+        yield repaired(invalid[number])
+
+    if total_invalid:
+        print(f"  列数不符的记录 {total_invalid} 行（已补空列/忽略多余列）")
+
+
 def import_csv(conn):
     """导入 CSV 数据"""
     cur = conn.cursor()
@@ -146,57 +344,46 @@ def import_csv(conn):
 
     print(f"  映射了 {len(csv_col_indices)} 列")
 
-    # 批量导入
-    batch_size = 50000
-    batch = []
-    total = 0
-    start_time = time.time()
-
     db_columns = list(csv_col_indices.keys())
     placeholders = ','.join(['?'] * len(db_columns))
-    insert_sql = f"INSERT OR REPLACE INTO enterprises ({','.join(db_columns)}) VALUES ({placeholders})"
+    insert_sql = f"INSERT INTO enterprises ({','.join(db_columns)}) VALUES ({placeholders})"
 
-    with open(CSV_PATH, 'r', encoding='utf-8-sig') as f:
-        reader = csv.reader(f)
-        next(reader)  # 跳过 header
+    indices = [csv_col_indices[db_col] for db_col in db_columns]
+    if pa is not None:
+        print("  使用 PyArrow 解析 CSV")
+        rows = iter_rows_arrow([headers[i] for i in indices], indices, db_columns)
+    else:
+        rows = iter_rows_csv(indices, db_columns)
 
-        for row in reader:
-            # 提取需要的列
-            values = []
-            for db_col in db_columns:
-                idx = csv_col_indices[db_col]
-                val = row[idx].strip() if idx < len(row) else ""
-
-                # 数值字段清洗
-                if db_col == 'employee_count':
-                    val = clean_number(val)
-                elif db_col == 'capital':
-                    val = clean_number(val)
-                elif db_col == 'prefecture_code':
-                    val = clean_prefecture_code(val)
-                else:
-                    val = val if val else None
-
-                values.append(val)
-
-            batch.append(values)
-            total += 1
+    total = 0
+    start_time = time.time()
 
-            if len(batch) >= batch_size:
-                cur.executemany(insert_sql, batch)
-                conn.commit()
+    def counted(rows):
+        """透传记录并输出进度"""
+        nonlocal total
+        for row in rows:
+            yield row
+            total += 1
+            if total % PROGRESS_INTERVAL == 0:
                 elapsed = time.time() - start_time
                 speed = total / elapsed if elapsed > 0 else 0
                 print(f"  已导入 {total:,} 行... ({speed:.0f} 行/秒)")
-                batch = []
 
-    # 写入剩余数据
-    if batch:
-        cur.executemany(insert_sql, batch)
-        conn.commit()
+    # 导入期间关闭 WAL 自动 checkpoint，结束后一次性 checkpoint 并截断 WAL
+    conn.execute("PRAGMA wal_autocheckpoint=0")
+
+    # 整个导入在一个事务内完成，只提交一次；executemany 直接消费生成器（不在 Python 侧攒批）
+    cur.executemany(insert_sql, counted(rows))
+    conn.commit()
 
     elapsed = time.time() - start_time
     print(f"  导入完成: {total:,} 行, 耗时 {elapsed:.1f} 秒")
+
+    dedupe_houjin_bangou(conn)
+    total = conn.execute("SELECT COUNT(*) FROM enterprises").fetchone()[0]
+
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.execute("PRAGMA wal_autocheckpoint=1000")
     return total
 
 
@@ -223,18 +410,24 @@ def main():
     conn.execute("PRAGMA temp_store=MEMORY")
 
     try:
-        print("[1/4] 建表...")
+        print("[1/5] 建表...")
         create_tables(conn)
 
-        print("[2/4] 导入 CSV 数据...")
+        print("[2/5] 导入 CSV 数据...")
         total = import_csv(conn)
 
-        print("[3/4] 建结构化索引...")
+        print("[3/5] 建结构化索引...")
         create_indexes(conn)
 
-        print("[4/4] 填充全文索引...")
+        print("[4/5] 填充全文索引...")
         populate_fts(conn)
 
+        print("[5/5] 更新统计信息...")
+        analyze(conn)
+
+        # 检索端以 immutable 只读方式打开，导入结束后切回 DELETE 日志模式（合并并删除 WAL 文件）
+        conn.execute("PRAGMA journal_mode=DELETE")
+
         # 统计
         cur = conn.cursor()
         cur.execute("SELECT COUNT(*) FROM enterprises WHERE business_summary IS NOT NULL AND business_summary != ''")
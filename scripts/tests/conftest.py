@@ -0,0 +1,76 @@
+"""
+scripts/ 测试共用的 fixture：把少量记录写成 CSV，用导入脚本建出检索用的 SQLite 库
+"""
+import csv
+import sys
+from pathlib import Path
+
+import pytest
+
+# 确保可以导入 scripts/ 下的模块
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+import enterprise_search
+import import_csv_to_sqlite
+
+# CSV 中与 COLUMN_MAP 无关的列（验证导入只取映射列）
+EXTRA_CSV_COLUMNS = ["カテゴリID", "備考"]
+
+
+def write_csv(path, rows):
+    """rows: DB 列名 → 值 的字典列表（缺省列写空串）；也接受 list 作为原样写出的行"""
+    header = list(import_csv_to_sqlite.COLUMN_MAP) + EXTRA_CSV_COLUMNS
+    db_columns = list(import_csv_to_sqlite.COLUMN_MAP.values())
+    with open(path, "w", encoding="utf-8-sig", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        for row in rows:
+            if isinstance(row, dict):
+                row = [row.get(col, "") for col in db_columns] + ["", ""]
+            writer.writerow(row)
+
+
+def close_search_conn():
+    """关闭 enterprise_search 当前线程缓存的连接"""
+    conn = getattr(enterprise_search._conn_pool, "conn", None)
+    if conn is not None:
+        conn.close()
+    enterprise_search._conn_pool.__dict__.clear()
+
+
+@pytest.fixture
+def build_db(tmp_path, capsys):
+    """build_db(rows, use_arrow=True) → 导入完成的数据库路径"""
+    counter = 0
+
+    def build(rows, use_arrow=True):
+        nonlocal counter
+        counter += 1
+        csv_path = tmp_path / f"input{counter}.csv"
+        db_path = tmp_path / f"enterprises{counter}.db"
+        write_csv(csv_path, rows)
+
+        with pytest.MonkeyPatch.context() as mp:
+            mp.setattr(import_csv_to_sqlite, "CSV_PATH", str(csv_path))
+            mp.setattr(import_csv_to_sqlite, "DB_PATH", str(db_path))
+            if not use_arrow:
+                mp.setattr(import_csv_to_sqlite, "pa", None)
+            import_csv_to_sqlite.main()
+        capsys.readouterr()
+        return str(db_path)
+
+    return build
+
+
+@pytest.fixture
+def search_db(build_db, monkeypatch):
+    """search_db(rows) → 导入后让 enterprise_search 指向该库"""
+
+    def build(rows):
+        db_path = build_db(rows)
+        monkeypatch.setattr(enterprise_search, "DB_PATH", db_path)
+        close_search_conn()
+        return db_path
+
+    yield build
+    close_search_conn()
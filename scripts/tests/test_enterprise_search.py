@@ -0,0 +1,176 @@
+"""
+enterprise_search 测试
+
+search() 与原先逐行 Python 实现（全量取回 → 门控 → 打分 → 稳定排序 → 分层）的结果对照
+"""
+import os
+import sqlite3
+from datetime import datetime
+
+import pytest
+
+import enterprise_search
+from enterprise_search import (
+    HARD_EXCLUDE,
+    get_positive_keywords,
+    score_enterprise,
+    search,
+)
+
+TOKYO = 13
+OSAKA = 27
+
+ROWS = [
+    {"houjin_bangou": "0000000000001", "company_name": "A社", "prefecture_code": TOKYO, "employee_count": 50, "business_summary": "SaaSプロダクト開発"},
+    {"houjin_bangou": "0000000000002", "company_name": "B社", "prefecture_code": TOKYO, "employee_count": 10, "business_summary": "クラウドAI"},
+    {"houjin_bangou": "0000000000003", "company_name": "C社", "prefecture_code": TOKYO, "employee_count": 10, "business_summary": "クラウドAI"},
+    {"houjin_bangou": "0000000000004", "company_name": "D社", "prefecture_code": TOKYO, "employee_count": 100, "business_type": "AIシステム"},
+    {"houjin_bangou": "0000000000005", "company_name": "E社", "prefecture_code": TOKYO, "employee_count": 100, "business_summary": "AIシステム"},
+    {"houjin_bangou": "0000000000006", "company_name": "F社", "prefecture_code": TOKYO, "employee_count": 30, "business_summary": "Webシステム受託開発"},
+    {"houjin_bangou": "0000000000007", "company_name": "G社", "prefecture_code": TOKYO, "employee_count": 20, "business_summary": "システム開発", "business_type": "コンサル"},
+    {"houjin_bangou": "0000000000008", "company_name": "H社", "prefecture_code": TOKYO, "employee_count": 8, "business_summary": "IT 制作"},
+    {"houjin_bangou": "0000000000009", "company_name": "I社", "prefecture_code": TOKYO, "employee_count": 40, "business_summary": "飲食店"},
+    {"houjin_bangou": "0000000000010", "company_name": "J社", "prefecture_code": TOKYO, "employee_count": 40},
+    {"houjin_bangou": "0000000000011", "company_name": "K社", "prefecture_code": OSAKA, "employee_count": 40, "business_summary": "SaaS"},
+    {"houjin_bangou": "0000000000012", "company_name": "L社", "prefecture_code": TOKYO, "business_summary": "アプリ"},
+    {"houjin_bangou": "0000000000013", "company_name": "M社", "prefecture_code": TOKYO, "employee_count": 5, "business_summary": "システム"},
+    {"houjin_bangou": "0000000000014", "company_name": "N社", "prefecture_code": TOKYO, "employee_count": 5, "business_summary": "システム"},
+    {"houjin_bangou": "0000000000015", "company_name": "O社", "prefecture_code": TOKYO, "employee_count": 3, "business_summary": "人材派遣 SaaS"},
+]
+
+CONDITIONS = {"prefectureIds": [TOKYO], "categoryCodes": ["G"]}
+
+
+class FrozenDatetime(datetime):
+    """固定报告时间戳"""
+
+    @classmethod
+    def now(cls, tz=None):
+        return cls(2026, 2, 14, 16, 30, 27)
+
+
+def reference_search(db_path, conditions):
+    """原先的实现：Layer 1 全量取回后在 Python 中过滤、打分、稳定排序、分层"""
+    conn = sqlite3.connect(db_path)
+    conn.row_factory = sqlite3.Row
+    where_clause, params = enterprise_search.build_where_clause(conditions)
+    rows = conn.execute(f"""
+        SELECT rowid, * FROM enterprises
+        WHERE {where_clause}
+          AND (business_summary IS NOT NULL AND business_summary != ''
+               OR business_type IS NOT NULL AND business_type != '')
+        ORDER BY rowid
+    """, params).fetchall()
+    conn.close()
+
+    positive_keywords = get_positive_keywords(conditions)
+    excluded = 0
+    scored = []
+    for row in rows:
+        text = (row["business_summary"] or "") + " " + (row["business_type"] or "")
+        if any(kw in text for kw in HARD_EXCLUDE):
+            excluded += 1
+            continue
+        if not any(kw in text for kw in positive_keywords):
+            continue
+        score, signals = score_enterprise(text, conditions.get("enhancedConditions", []))
+        scored.append((row["houjin_bangou"], score, row["employee_count"], signals))
+
+    scored.sort(key=lambda r: (r[1], r[2] or 0), reverse=True)
+    buckets = {
+        "high": [r for r in scored if r[1] >= 4],
+        "medium": [r for r in scored if 1 <= r[1] <= 3],
+        "low": [r for r in scored if r[1] <= 0],
+    }
+    return buckets, {"layer1_count": len(rows), "layer2_excluded": excluded, "layer2_count": len(scored)}
+
+
+def as_tuples(results):
+    return [(r.houjin_bangou, r.score, r.employee_count, r.signals) for r in results]
+
+
+@pytest.fixture
+def db_path(search_db):
+    return search_db(ROWS)
+
+
+def test_search_matches_reference_without_cap(db_path):
+    expected, expected_stats = reference_search(db_path, CONDITIONS)
+
+    results = search(CONDITIONS, limit=1000)
+
+    for bucket in ("high", "medium", "low"):
+        assert as_tuples(results[bucket]) == expected[bucket]
+        assert results["stats"][f"{bucket}_count"] == len(expected[bucket])
+    for key, value in expected_stats.items():
+        assert results["stats"][key] == value
+
+
+def test_limit_caps_each_bucket(db_path):
+    expected, _ = reference_search(db_path, CONDITIONS)
+
+    results = search(CONDITIONS, limit=1)
+
+    for bucket in ("high", "medium", "low"):
+        # limit 是每个分层的 top-K，不是总数；件数统计不受限制
+        assert as_tuples(results[bucket]) == expected[bucket][:1]
+        assert results["stats"][f"{bucket}_count"] == len(expected[bucket])
+
+
+def test_ties_keep_import_order(db_path):
+    results = search(CONDITIONS, limit=1000)
+
+    # 同分同员工数时按导入顺序（rowid）排列
+    high = [r.houjin_bangou for r in results["high"]]
+    assert high.index("0000000000002") < high.index("0000000000003")
+    low = [r.houjin_bangou for r in results["low"]]
+    assert low.index("0000000000013") < low.index("0000000000014")
+
+
+def test_format_markdown_report_returns_string_and_writes_file(db_path, tmp_path):
+    results = search(CONDITIONS, limit=1000)
+    saved = tmp_path / "out" / "report.md"
+
+    report = enterprise_search.format_markdown_report(results, CONDITIONS, str(saved))
+
+    assert isinstance(report, str)
+    assert report == saved.read_text(encoding="utf-8")
+    assert report.startswith("# 客户匹配结果\n")
+    assert "| 1 | A社 | 50 | 9 |" in report
+
+
+def test_write_markdown_report_streams_same_content(db_path, tmp_path, monkeypatch):
+    # 固定时间戳，两种输出逐字节一致
+    monkeypatch.setattr(enterprise_search, "datetime", FrozenDatetime)
+    results = search(CONDITIONS, limit=1000)
+    streamed = tmp_path / "streamed.md"
+
+    assert enterprise_search.write_markdown_report(results, CONDITIONS, str(streamed)) is None
+    assert streamed.read_text(encoding="utf-8") == enterprise_search.format_markdown_report(results, CONDITIONS)
+
+
+def test_fts_search_keeps_rank_next_to_score(db_path):
+    results = enterprise_search.fts_search("SaaS クラウド", prefecture_codes=[TOKYO])
+
+    assert results
+    for row in results:
+        assert row["rank"] == -row["score"]
+        assert row["highlight"]
+    # 按相关度排序：score 降序 / rank 升序
+    assert [r["rank"] for r in results] == sorted(r["rank"] for r in results)
+
+
+def test_connection_reopens_after_reimport(db_path, build_db):
+    assert search(CONDITIONS, limit=1000)["stats"]["high_count"] == 3
+
+    # 重新导入（新文件替换旧文件），同一进程内的下一次检索应读到新数据
+    os.replace(build_db(ROWS[:1]), db_path)
+
+    results = search(CONDITIONS, limit=1000)
+    assert [r.houjin_bangou for r in results["high"]] == ["0000000000001"]
+    assert results["stats"]["layer1_count"] == 1
+
+
+def test_connection_is_reused_while_file_unchanged(db_path):
+    first = enterprise_search._get_conn()
+    assert enterprise_search._get_conn() is first
@@ -0,0 +1,126 @@
+"""
+import_csv_to_sqlite 测试
+
+小 CSV 全流程导入：法人番号去重、FTS 行数、生成列 has_desc / established_ymd
+"""
+import os
+import sqlite3
+
+import pytest
+
+import import_csv_to_sqlite
+
+ROWS = [
+    {"houjin_bangou": "1000000000001", "company_name": "旧名称", "business_summary": "旧概要", "established_date": "2001-02-03"},
+    {"houjin_bangou": "1000000000002", "company_name": "概要のみ", "business_summary": "SaaS開発", "established_date": "2010/11/12"},
+    {"houjin_bangou": "1000000000003", "company_name": "種目のみ", "business_type": "ソフトウェア業", "established_date": "1999-12-31 00:00:00"},
+    {"houjin_bangou": "1000000000004", "company_name": "説明なし", "business_summary": "   ", "established_date": "平成元年"},
+    {"houjin_bangou": "1000000000001", "company_name": "新名称", "business_summary": "新概要", "established_date": "2005-06-07"},
+    {"houjin_bangou": "1000000000005", "company_name": "日付なし", "business_summary": "クラウド"},
+]
+
+
+@pytest.fixture(params=["arrow", "csv"])
+def conn(request, build_db):
+    use_arrow = request.param == "arrow"
+    if use_arrow and import_csv_to_sqlite.pa is None:
+        pytest.skip("pyarrow 未安装")
+    conn = sqlite3.connect(build_db(ROWS, use_arrow=use_arrow))
+    conn.row_factory = sqlite3.Row
+    yield conn
+    conn.close()
+
+
+def by_number(conn, columns):
+    rows = conn.execute(f"SELECT houjin_bangou, {columns} FROM enterprises ORDER BY houjin_bangou")
+    return {row[0]: tuple(row)[1:] for row in rows}
+
+
+def test_duplicate_houjin_bangou_keeps_last_row(conn):
+    names = by_number(conn, "company_name, business_summary")
+
+    assert len(names) == 5
+    assert names["1000000000001"] == ("新名称", "新概要")
+    unique = conn.execute(
+        "SELECT \"unique\" FROM pragma_index_list('enterprises') WHERE name = 'idx_houjin_bangou'"
+    ).fetchone()
+    assert unique[0] == 1
+
+
+def test_fts_tables_cover_every_row(conn):
+    total = conn.execute("SELECT COUNT(*) FROM enterprises").fetchone()[0]
+
+    for table in ("enterprises_fts", "enterprises_fts_tri"):
+        conn.execute(f"INSERT INTO {table}({table}) VALUES('integrity-check')")
+        assert conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0] == total
+
+    hits = conn.execute(
+        "SELECT e.houjin_bangou FROM enterprises_fts f JOIN enterprises e ON e.rowid = f.rowid "
+        "WHERE enterprises_fts MATCH '\"新概要\"'"
+    ).fetchall()
+    assert [h[0] for h in hits] == ["1000000000001"]
+    tri = conn.execute(
+        "SELECT COUNT(*) FROM enterprises_fts_tri WHERE enterprises_fts_tri MATCH '\"ソフトウェア\"'"
+    ).fetchone()[0]
+    assert tri == 1
+
+
+def test_generated_columns(conn):
+    values = by_number(conn, "has_desc, established_ymd, search_text")
+
+    assert values == {
+        "1000000000001": (1, 20050607, "新概要 "),
+        "1000000000002": (1, 20101112, "SaaS開発 "),
+        "1000000000003": (1, 19991231, " ソフトウェア業"),
+        "1000000000004": (0, 0, " "),
+        "1000000000005": (1, 0, "クラウド "),
+    }
+
+
+def test_import_leaves_database_in_delete_journal_mode(build_db):
+    db_path = build_db(ROWS)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "delete"
+    finally:
+        conn.close()
+    assert not os.path.exists(db_path + "-wal")
+
+
+def full_row(number, name, summary):
+    """18 列的完整 CSV 行（映射列 + 2 个无关列）"""
+    row = [""] * 18
+    row[0], row[1], row[11] = number, name, summary
+    return row
+
+
+PARITY_ROWS = [
+    ["2000000000001", "短い行（後で上書き）"],
+    full_row("2000000000002", "通常", "改行を\n含む概要"),
+    full_row("2000000000001", "完全な行（残る）", "SaaS"),
+    full_row("2000000000003", "完全な行（上書きされる）", "AI"),
+    ["2000000000003", "短い行（残る）", "", "", "", "", "", "", "", "", "", "クラウド"],
+    full_row("2000000000004", "余分な列", "IoT") + ["extra", "columns"],
+    ["2000000000005"],
+    full_row("2000000000006", "最後", "DX"),
+    ["2000000000007", "末尾の短い行"],
+]
+
+
+def test_arrow_and_csv_paths_produce_identical_tables(build_db):
+    if import_csv_to_sqlite.pa is None:
+        pytest.skip("pyarrow 未安装")
+
+    tables = []
+    for use_arrow in (True, False):
+        conn = sqlite3.connect(build_db(PARITY_ROWS, use_arrow=use_arrow))
+        tables.append(conn.execute("SELECT rowid, * FROM enterprises ORDER BY rowid").fetchall())
+        conn.close()
+
+    arrow_rows, csv_rows = tables
+    assert arrow_rows == csv_rows
+    names = {row[1]: row[2] for row in csv_rows}
+    assert names["2000000000001"] == "完全な行（残る）"
+    assert names["2000000000003"] == "短い行（残る）"
+    assert len(csv_rows) == 7